@@ -1,2 +1,10 @@
+import sys
+
+from kanslokartan.cli import COMMANDS
+
+if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+    from kanslokartan.cli import main
+    sys.exit(main(sys.argv[1:]))
+
 from kanslokartan.main import main
 main()
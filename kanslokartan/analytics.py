@@ -0,0 +1,247 @@
+"""Research analytics over journal and quiz history.
+
+Records are loaded once into columnar arrays (emotion code and epoch
+seconds per entry), then frequencies, the emotion transition matrix and
+streaks are computed over whole columns with NumPy. Without NumPy the same
+numbers come from plain Python loops over the same columns. Run the module
+to benchmark both paths:
+
+    python -m kanslokartan.analytics
+"""
+
+import json
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter
+
+from kanslokartan.journal import Entry
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DAY = 86400
+
+
+class Columns:
+    """Journal entries as parallel code and time columns, oldest first."""
+
+    __slots__ = ("codes", "times")
+
+    def __init__(self, codes, times):
+        self.codes = codes
+        self.times = times
+
+    @classmethod
+    def from_records(cls, records):
+        """Build columns from compact or version 1 journal records."""
+        codes = array("h")
+        times = array("q")
+        for record in records:
+            entry = Entry.from_record(record)
+            if entry is not None:
+                codes.append(entry.code)
+                times.append(entry.when)
+        if any(times[i] > times[i + 1] for i in range(len(times) - 1)):
+            order = sorted(range(len(times)), key=times.__getitem__)
+            codes = array("h", (codes[i] for i in order))
+            times = array("q", (times[i] for i in order))
+        return cls(codes, times)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def _gmtoff(t):
+    return time.localtime(t).tm_gmtoff
+
+
+def _utc_offsets(start, end):
+    """Return (starts, offsets): the local UTC offset from each start on.
+
+    Covers start..end inclusive. The offset is probed once a day and a
+    change is pinned to the second by bisection, so a history of years
+    costs a few thousand localtime() calls however many entries it has.
+    """
+    starts = [start]
+    offsets = [_gmtoff(start)]
+    previous = start
+    while previous < end:
+        probe = min(previous + DAY, end)
+        offset = _gmtoff(probe)
+        if offset != offsets[-1]:
+            lo, hi = previous, probe
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if _gmtoff(mid) == offsets[-1]:
+                    lo = mid
+                else:
+                    hi = mid
+            starts.append(hi)
+            offsets.append(offset)
+        previous = probe
+    return starts, offsets
+
+
+def _local_days(times, zones):
+    starts, offsets = zones
+    return [(t + offsets[bisect_right(starts, t) - 1]) // DAY for t in times]
+
+
+def _day_streaks(days, today):
+    """Return (longest, current) runs of consecutive days from sorted days."""
+    longest = current = run = 0
+    previous = None
+    for day in days:
+        if day == previous:
+            continue
+        run = run + 1 if previous is not None and day == previous + 1 else 1
+        longest = max(longest, run)
+        previous = day
+    if previous is not None and today - previous <= 1:
+        current = run
+    return longest, current
+
+
+def _analyze_python(columns, zones, today):
+    codes = columns.codes
+    frequencies = Counter(codes)
+    transitions = Counter(zip(codes, codes[1:]))
+    runs = {}
+    run = 0
+    for i, code in enumerate(codes):
+        run = run + 1 if i and codes[i - 1] == code else 1
+        if run > runs.get(code, 0):
+            runs[code] = run
+    longest, current = _day_streaks(_local_days(columns.times, zones), today)
+    return {
+        "frequencies": dict(frequencies),
+        "transitions": dict(transitions),
+        "emotion_runs": runs,
+        "day_streak": {"longest": longest, "current": current},
+    }
+
+
+def _analyze_numpy(columns, zones, today):
+    codes = np.frombuffer(columns.codes, dtype=np.int16).astype(np.intp)
+    times = np.frombuffer(columns.times, dtype=np.int64)
+    size = int(codes.max()) + 1
+    counts = np.bincount(codes, minlength=size)
+    pairs = np.bincount(codes[:-1] * size + codes[1:], minlength=size * size)
+
+    starts = np.flatnonzero(np.diff(codes, prepend=-1))
+    lengths = np.diff(np.append(starts, len(codes)))
+    runs = np.zeros(size, dtype=np.intp)
+    np.maximum.at(runs, codes[starts], lengths)
+
+    zone_starts, offsets = (np.array(z, dtype=np.int64) for z in zones)
+    zone = np.searchsorted(zone_starts, times, side="right") - 1
+    days = np.unique((times + offsets[zone]) // DAY)
+    breaks = np.flatnonzero(np.diff(days) != 1) + 1
+    bounds = np.concatenate(([0], breaks, [len(days)]))
+    streaks = np.diff(bounds)
+    current = int(streaks[-1]) if today - int(days[-1]) <= 1 else 0
+
+    nonzero = np.flatnonzero(pairs)
+    return {
+        "frequencies": {int(c): int(counts[c]) for c in np.flatnonzero(counts)},
+        "transitions": {(int(i // size), int(i % size)): int(pairs[i]) for i in nonzero},
+        "emotion_runs": {int(c): int(runs[c]) for c in np.flatnonzero(runs)},
+        "day_streak": {"longest": int(streaks.max()), "current": current},
+    }
+
+
+def analyze(columns, use_numpy=None, now=None):
+    """Return frequencies, transitions, per-emotion runs and day streaks.
+
+    transitions maps (from code, to code) to how often one entry followed
+    the other; emotion_runs is the longest run of consecutive entries with
+    the same emotion; day_streak counts consecutive local days with entries,
+    each entry dated with the UTC offset in force at its own time.
+    """
+    now = int(now or time.time())
+    today = (now + _gmtoff(now)) // DAY
+    if not len(columns):
+        return {"frequencies": {}, "transitions": {}, "emotion_runs": {},
+                "day_streak": {"longest": 0, "current": 0}}
+    zones = _utc_offsets(columns.times[0], columns.times[-1])
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        return _analyze_numpy(columns, zones, today)
+    return _analyze_python(columns, zones, today)
+
+
+def quiz_accuracy(results, use_numpy=None):
+    """Return {emotion: (answered, correct)} over quiz result records."""
+    keys = []
+    correct = array("b")
+    for r in results:
+        keys.append(r.get("emotion_id", r.get("emotion")))
+        correct.append(1 if r.get("correct") else 0)
+    if use_numpy is None:
+        use_numpy = np is not None
+    if not keys:
+        return {}
+    if not use_numpy:
+        totals = {}
+        for key, right in zip(keys, correct):
+            answered, hits = totals.get(key, (0, 0))
+            totals[key] = (answered + 1, hits + right)
+        return totals
+    try:
+        column = np.array(keys, dtype=np.int64)
+    except (TypeError, ValueError):
+        column = np.array([str(k) for k in keys])
+    labels, inverse = np.unique(column, return_inverse=True)
+    answered = np.bincount(inverse)
+    hits = np.bincount(inverse, weights=np.frombuffer(correct, dtype=np.int8))
+    original = {str(k): k for k in keys}
+    return {original[str(label)]: (int(a), int(h))
+            for label, a, h in zip(labels.tolist(), answered, hits)}
+
+
+def to_json(report):
+    """Return the report with tuple keys flattened for JSON output."""
+    out = dict(report)
+    out["transitions"] = {f"{a}>{b}": n for (a, b), n in report["transitions"].items()}
+    return out
+
+
+def benchmark(entries=1_000_000, repeat=3):
+    """Compare the NumPy and pure-Python paths on generated entries."""
+    import random
+
+    rng = random.Random(0)
+    start = int(time.time()) - entries * 600
+    codes = array("h", (rng.randint(1, 12) for _ in range(entries)))
+    times = array("q", (start + i * 600 + rng.randint(0, 300) for i in range(entries)))
+    columns = Columns(codes, times)
+    results = [{"emotion_id": rng.choice((28530, 28531, 6730)), "correct": rng.random() < 0.7}
+               for _ in range(entries // 10)]
+    timings = {}
+    reports = {}
+    for label, flag in (("python", False), ("numpy", True)):
+        if flag and np is None:
+            print("numpy: not installed")
+            continue
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            reports[label] = (analyze(columns, flag), quiz_accuracy(results, flag))
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        timings[label] = best
+        print(f"{label}: {entries} entries, {len(results)} results in {best:.3f} s")
+    if len(reports) == 2:
+        same = json.dumps(to_json(reports["python"][0]), sort_keys=True) == \
+            json.dumps(to_json(reports["numpy"][0]), sort_keys=True) and \
+            reports["python"][1] == reports["numpy"][1]
+        print(f"speedup: {timings['python'] / timings['numpy']:.1f}x, "
+              f"results {'match' if same else 'DIFFER'}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,294 @@
+"""Mood timeline and calendar heatmap.
+
+The chart is a horizontal strip of fixed-width tiles. Each tile is drawn
+once per mode, zoom level and height into an image surface and kept in a
+small LRU cache, so scrolling only blits cached tiles. At week and month
+zoom the columns are aggregated buckets from stats.MoodBins, which keeps
+years of history a few hundred columns wide. A new entry invalidates only
+the tiles holding its buckets, or a whole zoom level when its peak count
+rises and the colour scale changes.
+"""
+
+from collections import OrderedDict
+from datetime import date
+
+import gettext
+_ = gettext.gettext
+
+import cairo
+import gi
+gi.require_version("Gtk", "4.0")
+gi.require_version("Pango", "1.0")
+gi.require_version("PangoCairo", "1.0")
+gi.require_foreign("cairo")
+from gi.repository import Gtk, Pango, PangoCairo
+
+from kanslokartan.emotions import CODES
+from kanslokartan.stats import DAY, MONTH, WEEK, MoodBins
+
+TILE = 256
+CACHE_TILES = 96
+AXIS = 18
+MODES = ("timeline", "heatmap")
+ZOOM_NAMES = (_("Days"), _("Weeks"), _("Months"))
+# Column width in pixels per zoom level.
+BAR_WIDTH = (10, 8, 16)
+CELL = (14, 6, 12)
+LABEL_ROOM = 60
+
+COLORS = {
+    CODES["Happy"]: (0.98, 0.80, 0.18), CODES["Sad"]: (0.27, 0.47, 0.85),
+    CODES["Angry"]: (0.88, 0.22, 0.20), CODES["Scared"]: (0.55, 0.35, 0.75),
+    CODES["Surprised"]: (1.00, 0.60, 0.20), CODES["Disgusted"]: (0.45, 0.65, 0.20),
+    CODES["Tired"]: (0.55, 0.55, 0.60), CODES["Calm"]: (0.20, 0.70, 0.65),
+    CODES["Frustrated"]: (0.85, 0.40, 0.15), CODES["Excited"]: (0.95, 0.40, 0.65),
+    CODES["Confused"]: (0.60, 0.45, 0.30), CODES["Loved"]: (0.90, 0.30, 0.45),
+}
+UNKNOWN = (0.70, 0.70, 0.70)
+SIZE = max(CODES.values()) + 1
+
+
+def _column_date(level, key):
+    if level == DAY:
+        return date.fromordinal(key)
+    if level == WEEK:
+        return date.fromordinal(key * 7 + 1)
+    return date(key // 12, key % 12 + 1, 1)
+
+
+def _axis_label(level, when, previous):
+    """Label a column where the month (or, at month zoom, the year) changes."""
+    if level == MONTH:
+        return str(when.year) if previous is None or when.year != previous.year else None
+    if previous is None or (when.year, when.month) != (previous.year, previous.month):
+        return when.strftime("%b %Y" if when.month == 1 or previous is None else "%b")
+    return None
+
+
+class MoodChart(Gtk.Box):
+    """Scrollable, zoomable emotion chart over journal.Entry objects."""
+
+    def __init__(self, entries=()):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.mode = "timeline"
+        self.level = DAY
+        self.bins = MoodBins(SIZE, entries)
+        self._tiles = OrderedDict()
+        self._drag_start = 0.0
+        self._font = Pango.FontDescription.from_string("Sans 8")
+
+        toolbar = Gtk.Box(spacing=6)
+        timeline_btn = Gtk.ToggleButton(label=_("Timeline"), active=True)
+        heatmap_btn = Gtk.ToggleButton(label=_("Calendar"), group=timeline_btn)
+        timeline_btn.connect("toggled", self._on_mode, "timeline")
+        heatmap_btn.connect("toggled", self._on_mode, "heatmap")
+        toolbar.append(timeline_btn)
+        toolbar.append(heatmap_btn)
+        self.zoom_label = Gtk.Label(label=ZOOM_NAMES[self.level], hexpand=True)
+        toolbar.append(self.zoom_label)
+        for icon, step in (("zoom-out-symbolic", 1), ("zoom-in-symbolic", -1)):
+            btn = Gtk.Button(icon_name=icon)
+            btn.connect("clicked", lambda _b, s: self.set_level(self.level + s), step)
+            toolbar.append(btn)
+        self.append(toolbar)
+
+        self.adjustment = Gtk.Adjustment()
+        self.adjustment.connect("value-changed", lambda *_a: self.area.queue_draw())
+        self.area = Gtk.DrawingArea(hexpand=True, vexpand=True)
+        self.area.set_content_height(160)
+        self.area.set_draw_func(self._draw)
+        self.area.connect("resize", self._on_resize)
+        scroll = Gtk.EventControllerScroll.new(Gtk.EventControllerScrollFlags.BOTH_AXES)
+        scroll.connect("scroll", self._on_scroll)
+        self.area.add_controller(scroll)
+        drag = Gtk.GestureDrag()
+        drag.connect("drag-begin", lambda *_a: setattr(self, "_drag_start",
+                                                        self.adjustment.get_value()))
+        drag.connect("drag-update", lambda _g, dx, _dy: self.adjustment.set_value(
+            self._drag_start - dx))
+        self.area.add_controller(drag)
+        self.append(self.area)
+        self.append(Gtk.Scrollbar(orientation=Gtk.Orientation.HORIZONTAL,
+                                  adjustment=self.adjustment))
+
+    # -- data --
+
+    def set_entries(self, entries):
+        """Replace the chart data and scroll to the newest entries."""
+        self.bins = MoodBins(SIZE, entries)
+        self._tiles.clear()
+        self._update_adjustment(to_end=True)
+        self.area.queue_draw()
+
+    def add(self, entry):
+        """Add one entry, invalidating only the tiles it touches."""
+        at_end = self._at_end()
+        for level, key, rose, extended in self.bins.add(entry):
+            for mode in MODES:
+                if rose or extended:
+                    self._drop(mode, level)
+                    continue
+                width = self._column_width(mode, level)
+                x = self._column(mode, level, key) * width
+                self._drop(mode, level, {x // TILE, (x + width - 1) // TILE})
+        self._update_adjustment(to_end=at_end)
+        self.area.queue_draw()
+
+    # -- layout --
+
+    def _column_width(self, mode, level):
+        return BAR_WIDTH[level] if mode == "timeline" else CELL[level]
+
+    def _column(self, mode, level, key):
+        if mode == "heatmap" and level == DAY:
+            return (key - 1) // 7 - self.bins.first[WEEK]
+        return key - self.bins.first[level]
+
+    def _column_date(self, mode, level, column):
+        """Return the first day shown in a column."""
+        if mode == "heatmap" and level == DAY:
+            return _column_date(WEEK, self.bins.first[WEEK] + column)
+        return _column_date(level, self.bins.first[level] + column)
+
+    def _columns(self, mode, level):
+        if self.bins.first[level] is None:
+            return 0
+        if mode == "heatmap" and level == DAY:
+            return self.bins.last[WEEK] - self.bins.first[WEEK] + 1
+        return self.bins.last[level] - self.bins.first[level] + 1
+
+    def _content_width(self):
+        return self._columns(self.mode, self.level) * self._column_width(self.mode, self.level)
+
+    def _at_end(self):
+        adj = self.adjustment
+        return adj.get_value() + adj.get_page_size() >= adj.get_upper() - 1
+
+    def _update_adjustment(self, to_end=False, center=None):
+        page = self.area.get_width()
+        upper = max(self._content_width(), page)
+        if to_end:
+            value = upper - page
+        elif center is not None:
+            value = center * upper - page / 2
+        else:
+            value = self.adjustment.get_value()
+        self.adjustment.configure(max(0, min(value, upper - page)), 0, upper,
+                                  TILE / 4, page * 0.9, page)
+
+    def set_level(self, level):
+        """Switch zoom level, keeping the date in the middle in view."""
+        if not DAY <= level <= MONTH or level == self.level:
+            return
+        adj = self.adjustment
+        center = (adj.get_value() + adj.get_page_size() / 2) / max(adj.get_upper(), 1)
+        self.level = level
+        self.zoom_label.set_label(ZOOM_NAMES[level])
+        self._update_adjustment(center=center)
+        self.area.queue_draw()
+
+    def _on_mode(self, button, mode):
+        if button.get_active() and mode != self.mode:
+            self.mode = mode
+            self._update_adjustment(to_end=True)
+            self.area.queue_draw()
+
+    def _on_resize(self, area, width, height):
+        self._update_adjustment(to_end=self._at_end())
+
+    def _on_scroll(self, controller, dx, dy):
+        self.adjustment.set_value(self.adjustment.get_value() + (dx or dy) * 40)
+        return True
+
+    # -- tiles --
+
+    def _drop(self, mode, level, tiles=None):
+        for key in [k for k in self._tiles
+                    if k[0] == mode and k[1] == level and (tiles is None or k[2] in tiles)]:
+            del self._tiles[key]
+
+    def _tile(self, index, height):
+        key = (self.mode, self.level, index, height)
+        surface = self._tiles.get(key)
+        if surface is None:
+            surface = self._render_tile(self.mode, self.level, index, height)
+            self._tiles[key] = surface
+            while len(self._tiles) > CACHE_TILES:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(key)
+        return surface
+
+    def _render_tile(self, mode, level, index, height):
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, TILE, height)
+        cr = cairo.Context(surface)
+        cr.translate(-index * TILE, 0)
+        width = self._column_width(mode, level)
+        first = max(0, (index * TILE - LABEL_ROOM) // width)
+        last = min(self._columns(mode, level) - 1, ((index + 1) * TILE - 1) // width)
+        layout = PangoCairo.create_layout(cr)
+        layout.set_font_description(self._font)
+        previous = self._column_date(mode, level, first - 1) if first else None
+        for column in range(first, last + 1):
+            x = column * width
+            if mode == "heatmap" and level == DAY:
+                week = self.bins.first[WEEK] + column
+                for weekday in range(7):
+                    self._draw_cell(cr, level, week * 7 + 1 + weekday, x,
+                                    4 + weekday * CELL[DAY], width, CELL[DAY])
+            elif mode == "heatmap":
+                self._draw_cell(cr, level, self.bins.first[level] + column, x, 4,
+                                width, 7 * CELL[DAY])
+            else:
+                self._draw_bar(cr, level, self.bins.first[level] + column, x, width, height)
+            when = self._column_date(mode, level, column)
+            label = _axis_label(level, when, previous)
+            if label:
+                cr.set_source_rgba(0.5, 0.5, 0.5, 1)
+                cr.move_to(x + 1, height - AXIS + 2)
+                layout.set_text(label, -1)
+                PangoCairo.show_layout(cr, layout)
+            previous = when
+        surface.flush()
+        return surface
+
+    def _draw_bar(self, cr, level, key, x, width, height):
+        counts = self.bins.counts(level, key)
+        peak = self.bins.peaks[level]
+        if not counts or not peak:
+            return
+        bottom = height - AXIS
+        scale = (bottom - 6) / peak
+        for code, count in enumerate(counts):
+            if not count:
+                continue
+            h = count * scale
+            cr.set_source_rgb(*COLORS.get(code, UNKNOWN))
+            cr.rectangle(x + 1, bottom - h, width - 2, h)
+            cr.fill()
+            bottom -= h
+
+    def _draw_cell(self, cr, level, key, x, y, width, height):
+        counts = self.bins.counts(level, key)
+        peak = self.bins.peaks[level]
+        if counts and peak:
+            total = sum(counts)
+            dominant = max(range(len(counts)), key=counts.__getitem__)
+            cr.set_source_rgba(*COLORS.get(dominant, UNKNOWN), 0.3 + 0.7 * total / peak)
+        else:
+            cr.set_source_rgba(0.5, 0.5, 0.5, 0.12)
+        cr.rectangle(x + 1, y + 1, width - 2, height - 2)
+        cr.fill()
+
+    def _draw(self, area, cr, width, height):
+        if self.bins.first[self.level] is None:
+            layout = PangoCairo.create_layout(cr)
+            layout.set_text(_("No entries yet"), -1)
+            cr.set_source_rgba(0.5, 0.5, 0.5, 1)
+            cr.move_to(12, 12)
+            PangoCairo.show_layout(cr, layout)
+            return
+        offset = self.adjustment.get_value()
+        for index in range(int(offset // TILE), int((offset + width) // TILE) + 1):
+            cr.set_source_surface(self._tile(index, height), index * TILE - offset, 0)
+            cr.paint()
@@ -0,0 +1,292 @@
+"""Command line tools for Emotion Map.
+
+Nothing here imports GTK, so bulk jobs start in milliseconds:
+
+    python -m kanslokartan export journal -f csv -o journal.csv
+    python -m kanslokartan export all -f ndjson -o /srv/backup/$(hostname)
+    python -m kanslokartan warm-speech
+    python -m kanslokartan analyze -o analytics.json
+    python -m kanslokartan import backup/journal.csv
+"""
+
+import argparse
+import gettext
+import json
+import os
+import sys
+import tempfile
+import time
+
+from kanslokartan.journal import DISPLAY_FIELDS
+from kanslokartan.serialize import FORMATS, iter_format
+from kanslokartan.storage import open_store
+
+COMMANDS = ("export", "warm-speech", "analyze", "import")
+SOURCES = ("journal", "results", "profiles")
+# CSV columns per source. Imported results may carry further keys, so the
+# results columns are extended by a first pass over the data.
+CSV_FIELDS = {
+    "journal": DISPLAY_FIELDS,
+    "results": ("date", "emotion", "chosen", "correct", "emotion_id", "chosen_id", "latency",
+                "profile"),
+    "profiles": ("profile", "last_used", "summary", "data"),
+}
+
+
+def config_dir():
+    """Return the config directory GLib.get_user_config_dir() would use."""
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "kanslokartan")
+
+
+def profiles_dir():
+    return os.path.join(os.path.expanduser("~"), ".config", "kanslokartan", "profiles")
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_shards(path):
+    """Merge a profile directory's <key>.json shards into one dict."""
+    try:
+        names = sorted(os.listdir(path))
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    data = {}
+    for fname in names:
+        if fname.endswith(".json") and not fname.startswith("."):
+            value = _read_json(os.path.join(path, fname))
+            if value is not None:
+                data[fname[:-5]] = value
+    return data
+
+
+def _iter_profiles(directory):
+    """Yield each profile with its index entry and data.
+
+    Names, last use and summaries come from index.json; data is read from
+    the profile's shard directory, or from a flat <name>.json written
+    before profiles were sharded.
+    """
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    index = _read_json(os.path.join(directory, "index.json"))
+    index = index.get("profiles", {}) if isinstance(index, dict) else {}
+    names = set(index)
+    for fname in entries:
+        if fname.startswith(".") or fname == "index.json":
+            continue
+        if os.path.isdir(os.path.join(directory, fname)):
+            names.add(fname)
+        elif fname.endswith(".json"):
+            names.add(fname[:-5])
+    for name in sorted(names):
+        data = _read_shards(os.path.join(directory, name))
+        if data is None:
+            data = _read_json(os.path.join(directory, f"{name}.json"))
+        meta = index.get(name, {})
+        yield {"profile": name, "last_used": meta.get("last_used", 0),
+               "summary": meta.get("summary", {}), "data": data if data is not None else {}}
+
+
+def _flatten(items):
+    """Encode nested values as JSON so every record fits one CSV row."""
+    for item in items:
+        yield {k: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+               for k, v in item.items()}
+
+
+def iter_source(source, config, profiles):
+    """Yield the records of one source, oldest first."""
+    if source == "profiles":
+        return _iter_profiles(profiles)
+    store = open_store(config)
+    if source == "journal":
+        from kanslokartan.journal import iter_display
+        return iter_display(store.query_journal(), gettext.gettext)
+    return store.query_results()
+
+
+def export(source, fmt, out, config, profiles):
+    """Write one source to the text stream out; returns the record count."""
+    count = 0
+
+    def counted(items):
+        nonlocal count
+        for count, item in enumerate(items, 1):
+            yield item
+
+    fields = None
+    if fmt == "csv":
+        fields = list(CSV_FIELDS[source])
+        if source == "results":
+            for item in iter_source(source, config, profiles):
+                fields.extend(k for k in item if k not in fields)
+    items = counted(iter_source(source, config, profiles))
+    if fmt == "csv":
+        items = _flatten(items)
+    for chunk in iter_format(items, fmt, fields):
+        out.write(chunk)
+    return count
+
+
+def _export_to_file(source, fmt, path, config, profiles):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            count = export(source, fmt, f, config, profiles)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return count
+
+
+def _cmd_export(args):
+    if args.source == "all":
+        if not args.output or args.output == "-":
+            print("export all: --output must be a directory", file=sys.stderr)
+            return 2
+        os.makedirs(args.output, exist_ok=True)
+        for source in SOURCES:
+            path = os.path.join(args.output, f"{source}.{args.format}")
+            count = _export_to_file(source, args.format, path, args.config_dir, args.profiles_dir)
+            print(f"{path}: {count} records", file=sys.stderr)
+    elif args.output and args.output != "-":
+        _export_to_file(args.source, args.format, args.output, args.config_dir, args.profiles_dir)
+    else:
+        export(args.source, args.format, sys.stdout, args.config_dir, args.profiles_dir)
+    return 0
+
+
+def _cmd_warm_speech(args):
+    from kanslokartan.speech import available_languages, warm_up
+    languages = args.language or available_languages()
+    made = warm_up(languages, progress=lambda lang, text: print(f"[{lang}] {text}", file=sys.stderr))
+    print(f"{made} phrases synthesized for {', '.join(languages)}", file=sys.stderr)
+    return 0
+
+
+def _cmd_analyze(args):
+    from kanslokartan import analytics
+    store = open_store(args.config_dir)
+    start = time.perf_counter()
+    columns = analytics.Columns.from_records(store.query_journal())
+    report = analytics.to_json(analytics.analyze(columns, use_numpy=args.numpy))
+    report["quiz_accuracy"] = {str(k): v for k, v in
+                               analytics.quiz_accuracy(store.query_results(), args.numpy).items()}
+    text = json.dumps(report, indent=2) + "\n"
+    if args.output and args.output != "-":
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    print(f"{len(columns)} journal entries analysed in {time.perf_counter() - start:.2f} s",
+          file=sys.stderr)
+    return 0
+
+
+def _refresh_summaries(config, importer):
+    """Bring what the apps derive from the history up to date after an import.
+
+    The journal's mood rollups are rebuilt from the full history. Quiz
+    stats belong to the quiz app, which rebuilds a profile's file from its
+    results when the file is missing, so those of touched profiles are
+    removed.
+    """
+    if "journal" in importer.targets:
+        from kanslokartan.journal import Entry
+        from kanslokartan.stats import Rollups
+        store = open_store(config)
+        try:
+            rollups = Rollups(os.path.join(config, "stats.json"))
+            for record in store.query_journal():
+                entry = Entry.from_record(record)
+                if entry is not None:
+                    rollups.add(entry)
+            rollups.save()
+        finally:
+            store.close()
+    for profile in importer.profiles:
+        if not profile or profile.startswith(".") or os.path.basename(profile) != profile:
+            continue
+        try:
+            os.unlink(os.path.join(config, "quizstats", f"{profile}.json"))
+        except FileNotFoundError:
+            pass
+
+
+def _cmd_import(args):
+    from kanslokartan.importer import Importer, InvalidExport
+    if args.profile and args.into == "journal":
+        print("import: --profile only applies to quiz results", file=sys.stderr)
+        return 2
+    store = open_store(args.config_dir)
+    importer = Importer(store)
+    start = time.perf_counter()
+    try:
+        for path in args.files:
+            importer.import_file(path, args.format, args.into, args.profile)
+            print(f"{path}: done", file=sys.stderr)
+    except (InvalidExport, UnicodeDecodeError) as e:
+        print(f"import: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+        # Also after a failed file: earlier ones may have been merged.
+        _refresh_summaries(args.config_dir, importer)
+    stats = importer.stats
+    print(f"{stats['imported']} imported, {stats['duplicates']} duplicates, "
+          f"{stats['skipped']} unreadable of {stats['read']} records "
+          f"in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kanslokartan")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="export journal, quiz results or profiles")
+    p.add_argument("source", choices=SOURCES + ("all",))
+    p.add_argument("-f", "--format", choices=FORMATS, default="ndjson")
+    p.add_argument("-o", "--output", help="output file, or directory for 'all' (default: stdout)")
+    p.add_argument("--config-dir", default=config_dir())
+    p.add_argument("--profiles-dir", default=profiles_dir())
+    p.set_defaults(func=_cmd_export)
+
+    p = sub.add_parser("warm-speech", help="pre-synthesize every spoken phrase into the cache")
+    p.add_argument("-l", "--language", action="append",
+                   help="language to synthesize (repeatable; default: all available)")
+    p.set_defaults(func=_cmd_warm_speech)
+
+    p = sub.add_parser("analyze", help="emotion frequencies, transitions and streaks as JSON")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+    p.add_argument("--config-dir", default=config_dir())
+    p.add_argument("--no-numpy", dest="numpy", action="store_const", const=False,
+                   help="use the pure-Python path even if NumPy is installed")
+    p.set_defaults(func=_cmd_analyze)
+
+    p = sub.add_parser("import", help="merge exported journal or quiz files, skipping duplicates")
+    p.add_argument("files", nargs="+", metavar="FILE")
+    p.add_argument("-f", "--format", choices=("csv", "json", "ndjson"),
+                   help="input format (default: from the file extension)")
+    p.add_argument("--into", choices=("journal", "results"),
+                   help="target (default: detected from the first record)")
+    p.add_argument("--profile", help="tag imported quiz results with this profile")
+    p.add_argument("--config-dir", default=config_dir())
+    p.set_defaults(func=_cmd_import)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except OSError as e:
+        print(f"kanslokartan: {e}", file=sys.stderr)
+        return 1
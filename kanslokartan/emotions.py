@@ -0,0 +1,44 @@
+"""Emotions and coping strategies shown by Emotion Map.
+
+Names, descriptions and strategies are English msgids; translate them with
+gettext at display time.
+"""
+
+EMOTIONS = [
+    ("😊", "Happy", "Feeling good, content and joyful"),
+    ("😢", "Sad", "Feeling down, unhappy or tearful"),
+    ("😠", "Angry", "Feeling frustrated, irritated or furious"),
+    ("😨", "Scared", "Feeling afraid, anxious or worried"),
+    ("😲", "Surprised", "Feeling startled or amazed"),
+    ("🤢", "Disgusted", "Feeling repulsed or uncomfortable"),
+    ("😴", "Tired", "Feeling sleepy, exhausted or drained"),
+    ("😌", "Calm", "Feeling peaceful, relaxed and at ease"),
+    ("😤", "Frustrated", "Feeling stuck, annoyed or impatient"),
+    ("🤩", "Excited", "Feeling thrilled, eager and full of energy"),
+    ("😕", "Confused", "Feeling uncertain or puzzled"),
+    ("🥰", "Loved", "Feeling cared for, safe and appreciated"),
+]
+
+# Stable journal codes. Never renumber; new emotions get the next free code.
+CODES = {
+    "Happy": 1, "Sad": 2, "Angry": 3, "Scared": 4, "Surprised": 5, "Disgusted": 6,
+    "Tired": 7, "Calm": 8, "Frustrated": 9, "Excited": 10, "Confused": 11, "Loved": 12,
+}
+
+STRATEGIES = {
+    "Angry": ["Take 5 deep breaths", "Count to 10 slowly", "Squeeze a stress ball", "Walk away and cool down"],
+    "Scared": ["Tell someone you trust", "Breathe slowly", "Think of your safe place", "Hold something soft"],
+    "Sad": ["Talk to someone", "Draw or write about it", "Listen to music", "Give yourself a hug"],
+    "Frustrated": ["Take a break", "Try again later", "Ask for help", "Do something you enjoy first"],
+    "Tired": ["Rest for a few minutes", "Drink water", "Take a short walk", "Listen to calm music"],
+}
+
+
+def phrases(translate=lambda s: s):
+    """Return every phrase the app can speak, translated with translate."""
+    texts = []
+    for _emoji, name, desc in EMOTIONS:
+        texts += [translate(name), translate(desc)]
+    for lines in STRATEGIES.values():
+        texts += [translate(line) for line in lines]
+    return texts
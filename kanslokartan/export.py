@@ -1,18 +1,13 @@
 """Export functionality for Emotion Map."""
 
-import csv
-import io
-import json
+import os
+import threading
 from datetime import datetime
 
 import gettext
 _ = gettext.gettext
 
-from kanslokartan import __version__
-
-APP_LABEL = _("Emotion Map")
-AUTHOR = "Daniel Nylander"
-WEBSITE = "www.autismappar.se"
+from kanslokartan.serialize import APP_LABEL, WEBSITE, data_to_csv, data_to_json, iter_format
 
 import gi
 gi.require_version('Gtk', '4.0')
@@ -20,78 +15,65 @@ gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, Gio, GLib
 
 
-def data_to_csv(items, label=""):
-    """Export data as CSV."""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    if items and isinstance(items[0], dict):
-        writer.writerow(items[0].keys())
-        for item in items:
-            writer.writerow(item.values())
-    writer.writerow([])
-    writer.writerow([f"{APP_LABEL} v{__version__} — {WEBSITE}"])
-    return output.getvalue()
+PROGRESS_EVERY = 1000
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled through its Gio.Cancellable."""
+
 
+def _count(items, progress, cancellable):
+    """Pass items through, reporting progress and honouring cancellation."""
+    for n, item in enumerate(items, 1):
+        if n % PROGRESS_EVERY == 0:
+            if cancellable is not None and cancellable.is_cancelled():
+                raise ExportCancelled()
+            if progress:
+                progress(n)
+        yield item
 
-def data_to_json(items, label=""):
-    """Export data as JSON."""
-    data = {
-        "data": items,
-        "_exported_by": f"{APP_LABEL} v{__version__}",
-        "_author": AUTHOR,
-        "_website": WEBSITE,
-    }
-    return json.dumps(data, indent=2, ensure_ascii=False)
+
+def write_export(items, ext, path, title="", progress=None, cancellable=None, fields=None):
+    """Stream items to path in the given format; removes the file on failure.
+
+    fields is the CSV column schema, see serialize.iter_csv().
+    """
+    items = _count(items, progress, cancellable)
+    try:
+        if ext == "pdf":
+            if not export_data_pdf(items, title or APP_LABEL, path):
+                raise RuntimeError(_("PDF support requires pycairo"))
+            return
+        chunks = iter_format(items, ext, fields)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for chunk in chunks:
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.unlink(path)
+        raise
 
 
 def export_data_pdf(items, title, output_path):
-    """Export data as PDF."""
+    """Export data as a paginated PDF report."""
     try:
-        import cairo
-    except ImportError:
-        try:
-            import cairocffi as cairo
-        except ImportError:
-            return False
-
-    width, height = 595, 842
-    surface = cairo.PDFSurface(output_path, width, height)
-    ctx = cairo.Context(surface)
-
-    ctx.set_font_size(24)
-    ctx.move_to(40, 50)
-    ctx.show_text(title)
-
-    ctx.set_font_size(12)
-    ctx.move_to(40, 75)
-    ctx.show_text(datetime.now().strftime("%Y-%m-%d"))
-
-    y = 110
-    ctx.set_font_size(12)
-    for item in items:
-        if y > height - 40:
-            surface.show_page()
-            y = 40
-        if isinstance(item, dict):
-            text = " | ".join(str(v) for v in item.values())
-        else:
-            text = str(item)
-        ctx.move_to(40, y)
-        ctx.show_text(text[:80])
-        y += 20
-
-    ctx.set_font_size(9)
-    ctx.set_source_rgb(0.5, 0.5, 0.5)
-    footer = f"{APP_LABEL} v{__version__} — {WEBSITE} — {datetime.now().strftime('%Y-%m-%d')}"
-    ctx.move_to(40, height - 20)
-    ctx.show_text(footer)
-
-    surface.finish()
+        from kanslokartan.report import write_pdf
+    except (ImportError, ValueError):
+        return False
+    write_pdf(items, title, output_path)
     return True
 
 
-def show_export_dialog(window, items, title="", status_callback=None):
-    """Show export dialog."""
+def show_export_dialog(window, items, title="", status_callback=None, cancellable=None,
+                       fields=None):
+    """Show export dialog.
+
+    items may be any iterable, including a generator straight from storage;
+    it is consumed once on a worker thread. fields is the CSV column
+    schema. Returns the Gio.Cancellable that stops the export.
+    """
+    if cancellable is None:
+        cancellable = Gio.Cancellable()
     dialog = Adw.AlertDialog.new(_("Export"), _("Choose export format:"))
     dialog.add_response("cancel", _("Cancel"))
     dialog.add_response("csv", _("CSV"))
@@ -99,37 +81,42 @@ def show_export_dialog(window, items, title="", status_callback=None):
     dialog.add_response("pdf", _("PDF"))
     dialog.set_default_response("csv")
     dialog.set_close_response("cancel")
-    dialog.connect("response", _on_response, window, items, title, status_callback)
+    dialog.connect("response", _on_response, window, items, title, status_callback, cancellable,
+                   fields)
     dialog.present(window)
+    return cancellable
 
 
-def _on_response(dialog, response, window, items, title, status_callback):
+def _on_response(dialog, response, window, items, title, status_callback, cancellable, fields):
     if response == "cancel":
         return
     ext = response
     fd = Gtk.FileDialog.new()
     fd.set_title(_("Save Export"))
     fd.set_initial_name(f"kanslokartan_{datetime.now().strftime('%Y-%m-%d')}.{ext}")
-    fd.save(window, None, _on_save, items, title, ext, status_callback)
+    fd.save(window, None, _on_save, items, title, ext, status_callback, cancellable, fields)
 
 
-def _on_save(dialog, result, items, title, ext, status_callback):
+def _on_save(dialog, result, items, title, ext, status_callback, cancellable, fields):
     try:
         gfile = dialog.save_finish(result)
     except GLib.Error:
         return
     path = gfile.get_path()
-    try:
-        if ext == "csv":
-            with open(path, "w") as f:
-                f.write(data_to_csv(items))
-        elif ext == "json":
-            with open(path, "w") as f:
-                f.write(data_to_json(items))
-        elif ext == "pdf":
-            export_data_pdf(items, title or APP_LABEL, path)
-        if status_callback:
-            status_callback(_("Exported %s") % ext.upper())
-    except Exception as e:
+
+    def report(message):
         if status_callback:
-            status_callback(_("Export error: %s") % str(e))
+            GLib.idle_add(status_callback, message)
+
+    def run():
+        try:
+            write_export(items, ext, path, title, progress=lambda n: report(
+                _("Exporting %s… %d rows") % (ext.upper(), n)), cancellable=cancellable,
+                fields=fields)
+            report(_("Exported %s") % ext.upper())
+        except ExportCancelled:
+            report(_("Export cancelled"))
+        except Exception as e:
+            report(_("Export error: %s") % str(e))
+
+    threading.Thread(target=run, name="kanslokartan-export", daemon=True).start()
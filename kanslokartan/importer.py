@@ -0,0 +1,324 @@
+"""Streaming import of exported journals and quiz results.
+
+Reads the CSV, JSON and NDJSON files written by the exporters
+(serialize.data_to_csv/data_to_json/iter_ndjson and the quiz app's
+export_csv/export_json) one record at a time, normalises each record to
+the stored format and merges it into the store in batches, in date order,
+so history older than the store's hot window lands in its archive.
+Records are deduplicated by a 64-bit hash of their normalised content,
+checked against what is already stored and against earlier records of the
+same import, so merging a backup twice adds nothing. Memory is bounded by the batch size
+plus eight bytes per known record.
+"""
+
+import csv
+import hashlib
+import heapq
+import json
+import os
+import re
+import time
+from array import array
+from bisect import bisect_left
+
+import gettext
+_ = gettext.gettext
+
+from kanslokartan.journal import Entry
+
+BATCH = 5000
+CHUNK = 1 << 16
+TARGETS = ("journal", "results")
+_DATA_KEY = re.compile(r'"data"\s*:\s*\[')
+_RESULT_FIELDS = {"result", "correct", "chosen", "chosen_id"}
+
+
+class InvalidExport(ValueError):
+    """Raised for input that is not an export file."""
+
+
+class SeenHashes:
+    """A set of 64-bit hashes held as sorted arrays, eight bytes each.
+
+    New hashes collect in a small set; full sets become sorted runs that
+    are merged like a binary counter, so lookups bisect a few runs.
+    """
+
+    def __init__(self, recent=4096):
+        self._limit = recent
+        self._recent = set()
+        self._runs = []
+
+    def __len__(self):
+        return len(self._recent) + sum(len(run) for run in self._runs)
+
+    def __contains__(self, value):
+        if value in self._recent:
+            return True
+        for run in self._runs:
+            i = bisect_left(run, value)
+            if i < len(run) and run[i] == value:
+                return True
+        return False
+
+    def add(self, value):
+        self._recent.add(value)
+        if len(self._recent) >= self._limit:
+            run = array("Q", sorted(self._recent))
+            self._recent = set()
+            while self._runs and len(self._runs[-1]) <= len(run):
+                run = array("Q", heapq.merge(self._runs.pop(), run))
+            self._runs.append(run)
+
+
+def content_hash(target, record):
+    """Hash the fields that identify a record in every export format.
+
+    Exports write journal times to the minute and quiz results without
+    ids or latency, so only what survives a round trip is hashed.
+    """
+    if target == "journal":
+        key = [record["e"], record["t"] // 60, record.get("n")]
+    else:
+        key = [record.get("date"), record.get("emotion"), bool(record.get("correct"))]
+    text = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# -- readers --
+
+def _header_keys(header):
+    names = {}
+    for key, label in (("date", "Date"), ("details", "Details"), ("result", "Result")):
+        names[label.lower()] = key
+        names[_(label).lower()] = key
+    return [names.get(h.strip().lower(), h.strip()) for h in header]
+
+
+def iter_csv(f):
+    """Yield dicts from an exported CSV, stopping at the branding footer."""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if not header:
+        return
+    keys = _header_keys(header)
+    for row in reader:
+        if not row or not any(row):
+            return
+        yield dict(zip(keys, row))
+
+
+def iter_json(f):
+    """Yield the records of a JSON export without loading the whole file.
+
+    Accepts a bare array or an object with a "data" array, as written by
+    both apps' exporters.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(CHUNK)
+    eof = not buf
+    start = buf.lstrip()[:1]
+    if start == "[":
+        pos = buf.index("[") + 1
+    else:
+        while True:
+            match = _DATA_KEY.search(buf)
+            if match:
+                pos = match.end()
+                break
+            if eof:
+                raise InvalidExport("no \"data\" array found")
+            more = f.read(CHUNK)
+            eof = not more
+            buf = buf[-16:] + more
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            if pos >= len(buf):
+                raise ValueError("buffer exhausted")
+            record, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise InvalidExport("truncated JSON export")
+            more = f.read(CHUNK)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        pos = end
+        if pos > CHUNK:
+            buf = buf[pos:]
+            pos = 0
+        if isinstance(record, dict):
+            yield record
+
+
+def iter_ndjson(f):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            yield record
+
+
+READERS = {"csv": iter_csv, "json": iter_json, "ndjson": iter_ndjson, "jsonl": iter_ndjson}
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in READERS:
+        return ext
+    raise InvalidExport(f"unknown file type: {path}")
+
+
+# -- normalisation --
+
+def _truth(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def _number(value, kind):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def journal_record(record):
+    """Return the compact journal record for an exported row, or None."""
+    entry = Entry.from_record(record)
+    return entry.to_record() if entry is not None else None
+
+
+def result_record(record, profile=None):
+    """Return a stored quiz result for an exported row, or None."""
+    if "details" in record and "emotion" not in record:
+        result = {"date": record.get("date", ""), "emotion": record["details"],
+                  "correct": _truth(record.get("result"))}
+    else:
+        result = {k: v for k, v in record.items() if v != ""}
+        if "correct" in result:
+            result["correct"] = _truth(result["correct"])
+        for key, kind in (("emotion_id", int), ("chosen_id", int), ("latency", float)):
+            if key in result:
+                result[key] = _number(result[key], kind)
+    if not result.get("date"):
+        return None
+    if profile:
+        result["profile"] = profile
+    return result
+
+
+def detect_target(record):
+    return "results" if _RESULT_FIELDS & set(record) else "journal"
+
+
+# -- import --
+
+class Importer:
+    """Merges exported records into a store, batch by batch."""
+
+    def __init__(self, store, batch=BATCH):
+        self.store = store
+        self.batch = batch
+        self._seen = {}
+        self.stats = {"read": 0, "imported": 0, "duplicates": 0, "skipped": 0}
+        # What was written, so callers can refresh summaries built from it.
+        self.targets = set()
+        self.profiles = set()
+
+    def _known(self, target):
+        """Hash what the store already holds for target, once."""
+        seen = self._seen.get(target)
+        if seen is None:
+            seen = self._seen[target] = SeenHashes()
+            if target == "journal":
+                records = (journal_record(r) for r in self.store.query_journal())
+            else:
+                records = (result_record(r) for r in self.store.query_results())
+            for record in records:
+                if record is not None:
+                    seen.add(content_hash(target, record))
+        return seen
+
+    def _write(self, target, batch):
+        if target == "journal":
+            self.store.merge_journal(batch)
+        else:
+            self.store.merge_results(batch)
+            self.profiles.update(r.get("profile", "default") for r in batch)
+        self.targets.add(target)
+        self.stats["imported"] += len(batch)
+
+    def feed(self, records, target=None, profile=None):
+        """Import an iterable of exported records; returns self.stats."""
+        batch = []
+        seen = None
+        for raw in records:
+            self.stats["read"] += 1
+            if target is None:
+                target = detect_target(raw)
+            if seen is None:
+                seen = self._known(target)
+            record = journal_record(raw) if target == "journal" else result_record(raw, profile)
+            if record is None:
+                self.stats["skipped"] += 1
+                continue
+            digest = content_hash(target, record)
+            if digest in seen:
+                self.stats["duplicates"] += 1
+                continue
+            seen.add(digest)
+            batch.append(record)
+            if len(batch) >= self.batch:
+                self._write(target, batch)
+                batch = []
+        if batch:
+            self._write(target, batch)
+        return self.stats
+
+    def import_file(self, path, fmt=None, target=None, profile=None):
+        reader = READERS[fmt or detect_format(path)]
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            return self.feed(reader(f), target, profile)
+
+
+def benchmark(records=1_000_000, directory=None):
+    """Import generated NDJSON into a temporary store and report peak memory."""
+    import resource
+    import tempfile
+
+    from kanslokartan.serialize import iter_ndjson as write_ndjson
+    from kanslokartan.storage import JsonStore
+
+    with tempfile.TemporaryDirectory(dir=directory) as root:
+        path = os.path.join(root, "journal.ndjson")
+        start = int(time.time()) - records * 600
+        rows = ({"date": time.strftime("%Y-%m-%d %H:%M", time.localtime(start + i * 600)),
+                 "emotion": "Happy", "emoji": "😊"} for i in range(records))
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(write_ndjson(rows))
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        store = JsonStore(os.path.join(root, "config"))
+        for label in ("first import", "second import"):
+            t0 = time.perf_counter()
+            stats = Importer(store).import_file(path)
+            store.close()
+            print(f"{label}: {stats['imported']} imported, {stats['duplicates']} duplicates "
+                  f"in {time.perf_counter() - t0:.1f} s")
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"peak RSS {peak / 1024:.0f} MB ({(peak - before) / 1024:.0f} MB above start)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,107 @@
+"""Compact journal entries.
+
+On disk an entry is {"e": code, "t": epoch seconds} plus an optional "n"
+note; codes come from emotions.CODES, so records mean the same thing in
+every locale. Names, emoji and dates are resolved only for display.
+Version 1 records ({"date", "emotion", "emoji"} with a translated label)
+are still read, mapped to codes by their emoji.
+"""
+
+import time
+
+from kanslokartan.emotions import CODES, EMOTIONS
+
+VERSION = 2
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+# Keys of Entry.to_display(), in column order.
+DISPLAY_FIELDS = ("date", "emotion", "emoji", "note")
+
+_BY_CODE = {CODES[name]: (emoji, name, desc) for emoji, name, desc in EMOTIONS}
+_BY_EMOJI = {emoji: CODES[name] for emoji, name, _desc in EMOTIONS}
+_BY_NAME = {name: CODES[name] for _emoji, name, _desc in EMOTIONS}
+
+
+class Entry:
+    """One journal entry: emotion code, epoch seconds and an optional note."""
+
+    __slots__ = ("code", "when", "note")
+
+    def __init__(self, code, when=None, note=None):
+        self.code = code
+        self.when = int(time.time()) if when is None else when
+        self.note = note or None
+
+    @classmethod
+    def from_record(cls, record):
+        """Return an Entry for a compact or version 1 record, or None."""
+        if "e" in record:
+            try:
+                return cls(int(record["e"]), int(record["t"]), record.get("n"))
+            except (KeyError, TypeError, ValueError):
+                return None
+        try:
+            when = int(time.mktime(time.strptime(str(record.get("date", ""))[:16], DATE_FORMAT)))
+        except ValueError:
+            return None
+        label = record.get("emotion", "")
+        code = _BY_EMOJI.get(record.get("emoji"), _BY_NAME.get(label, 0))
+        return cls(code, when, record.get("note") or (None if code else label))
+
+    def to_record(self):
+        record = {"e": self.code, "t": self.when}
+        if self.note:
+            record["n"] = self.note
+        return record
+
+    @property
+    def name(self):
+        """The emotion's English msgid, or "" for an unknown code."""
+        return _BY_CODE.get(self.code, ("", "", ""))[1]
+
+    @property
+    def emoji(self):
+        return _BY_CODE.get(self.code, ("", "", ""))[0]
+
+    def date(self, fmt=DATE_FORMAT):
+        return time.strftime(fmt, time.localtime(self.when))
+
+    def label(self, translate=lambda s: s):
+        return translate(self.name) if self.name else (self.note or "")
+
+    def to_display(self, translate=lambda s: s):
+        """Return a flat, human-readable dict for exports.
+
+        Every row has the same keys, so CSV columns line up.
+        """
+        return {"date": self.date(), "emotion": self.label(translate), "emoji": self.emoji,
+                "note": self.note or ""}
+
+
+def label(code, translate=lambda s: s):
+    """Return the translated name for an emotion code."""
+    entry = _BY_CODE.get(int(code))
+    return f"{entry[0]} {translate(entry[1])}" if entry else str(code)
+
+
+def upgrade(record):
+    """Convert any record to the compact format; used by the migration."""
+    entry = Entry.from_record(record)
+    return entry.to_record() if entry is not None else record
+
+
+def load(records):
+    """Return Entry objects for records, skipping unreadable ones."""
+    entries = []
+    for record in records:
+        entry = Entry.from_record(record)
+        if entry is not None:
+            entries.append(entry)
+    return entries
+
+
+def iter_display(records, translate=lambda s: s):
+    """Yield export rows for records with labels resolved by translate."""
+    for record in records:
+        entry = Entry.from_record(record)
+        if entry is not None:
+            yield entry.to_display(translate)
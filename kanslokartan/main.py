@@ -1,20 +1,28 @@
 """Känslokartan — Emotion recognition and journal."""
 
 import gettext
-import json
 import locale
 import os
-import subprocess
-from datetime import datetime
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
+from kanslokartan import startup
+startup.mark("interpreter")
+
 import gi
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
-from gi.repository import Adw, Gdk, Gio, GLib, Gtk
+from gi.repository import Adw, Gdk, Gio, GLib, GObject, Gtk
+startup.mark("import gtk")
 
 from kanslokartan import __version__
-from kanslokartan.export import show_export_dialog
+from kanslokartan import journal
+from kanslokartan.emotions import CODES, EMOTIONS, STRATEGIES
+from kanslokartan.search import JournalIndex, parse_date
+from kanslokartan.stats import Rollups
+from kanslokartan.storage import open_store
+from kanslokartan.writer import get_writer
 
 try:
     locale.setlocale(locale.LC_ALL, "")
@@ -27,58 +35,129 @@ for d in [Path(__file__).parent.parent / "po", Path("/usr/share/locale")]:
         break
 gettext.textdomain("kanslokartan")
 _ = gettext.gettext
+startup.mark("import app")
 
 APP_ID = "se.danielnylander.kanslokartan"
-
-EMOTIONS = [
-    ("😊", "Happy", "Feeling good, content and joyful"),
-    ("😢", "Sad", "Feeling down, unhappy or tearful"),
-    ("😠", "Angry", "Feeling frustrated, irritated or furious"),
-    ("😨", "Scared", "Feeling afraid, anxious or worried"),
-    ("😲", "Surprised", "Feeling startled or amazed"),
-    ("🤢", "Disgusted", "Feeling repulsed or uncomfortable"),
-    ("😴", "Tired", "Feeling sleepy, exhausted or drained"),
-    ("😌", "Calm", "Feeling peaceful, relaxed and at ease"),
-    ("😤", "Frustrated", "Feeling stuck, annoyed or impatient"),
-    ("🤩", "Excited", "Feeling thrilled, eager and full of energy"),
-    ("😕", "Confused", "Feeling uncertain or puzzled"),
-    ("🥰", "Loved", "Feeling cared for, safe and appreciated"),
-]
-
-STRATEGIES = {
-    "Angry": ["Take 5 deep breaths", "Count to 10 slowly", "Squeeze a stress ball", "Walk away and cool down"],
-    "Scared": ["Tell someone you trust", "Breathe slowly", "Think of your safe place", "Hold something soft"],
-    "Sad": ["Talk to someone", "Draw or write about it", "Listen to music", "Give yourself a hug"],
-    "Frustrated": ["Take a break", "Try again later", "Ask for help", "Do something you enjoy first"],
-    "Tired": ["Rest for a few minutes", "Drink water", "Take a short walk", "Listen to calm music"],
-}
-
+SEARCH_LIMIT = 1000
+# Journal rows kept as GObjects; the rest are made when scrolled into view.
+ITEM_CACHE = 256
 
 def _config_dir():
     p = Path(GLib.get_user_config_dir()) / "kanslokartan"
     p.mkdir(parents=True, exist_ok=True)
     return p
 
+_store = None
+
+def _get_store():
+    global _store
+    if _store is None:
+        _store = open_store(_config_dir())
+        if _store.journal_version() < journal.VERSION:
+            _store.migrate_journal(journal.upgrade, journal.VERSION)
+    return _store
+
 def _load_journal():
-    path = _config_dir() / "journal.json"
-    if path.exists():
-        try:
-            return json.loads(path.read_text())
-        except Exception:
-            pass
-    return []
-
-def _save_journal(journal):
-    path = _config_dir() / "journal.json"
-    path.write_text(json.dumps(journal[-500:], indent=2, ensure_ascii=False))
+    """Return the newest entries; the full history comes with the search index."""
+    return journal.load(_get_store().load_journal())
+
+def _append_journal(entry, on_done=None):
+    get_writer().append("journal", _get_store().extend_journal, entry.to_record(),
+                        on_done=on_done)
+
+def _clear_journal(on_done=None):
+    get_writer().submit(None, _get_store().clear_journal, on_done=on_done)
+
+def _load_stats():
+    """Load the rollups; a rebuild streams the whole journal, archive included."""
+    history = (journal.Entry.from_record(r) for r in _get_store().query_journal())
+    return Rollups.load(_config_dir() / "stats.json", (e for e in history if e is not None))
+
+def _save_stats(stats, on_done=None):
+    get_writer().submit("stats", stats.save, on_done=on_done)
+
+_speaker = None
+
+def _get_speaker():
+    global _speaker
+    if _speaker is None:
+        from kanslokartan.speech import Speaker
+        _speaker = Speaker()
+    return _speaker
 
 def _speak(text):
-    for cmd in [["piper", "--model", "sv_SE-nst-medium", "--output_raw"], ["espeak-ng", "-v", "sv"]]:
-        try:
-            subprocess.Popen(cmd + [text], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _get_speaker().speak(text)
+
+
+class JournalItem(GObject.Object):
+    """A journal entry as an item of the journal list model."""
+
+    __gtype_name__ = "KanslokartanJournalItem"
+
+    title = GObject.Property(type=str, default="")
+    subtitle = GObject.Property(type=str, default="")
+
+    def __init__(self, entry):
+        subtitle = entry.date()
+        if entry.note and entry.name:
+            subtitle += f" · {entry.note}"
+        super().__init__(title=f"{entry.emoji} {entry.label(_)}".strip(), subtitle=subtitle)
+
+
+class JournalModel(GObject.Object, Gio.ListModel):
+    """Newest-first list model over a sequence of journal.Entry objects.
+
+    Items are created only when the list view asks for a position and at
+    most ITEM_CACHE of them are kept, so the history can grow without the
+    model holding a GObject per entry. Swapping the sequence (history,
+    search results) is O(1).
+    """
+
+    __gtype_name__ = "KanslokartanJournalModel"
+
+    def __init__(self):
+        super().__init__()
+        self._entries = []
+        self._newest_first = False
+        self._count = 0
+        self._items = OrderedDict()
+
+    def do_get_item_type(self):
+        return JournalItem.__gtype__
+
+    def do_get_n_items(self):
+        return self._count
+
+    def do_get_item(self, position):
+        if position >= self._count:
+            return None
+        item = self._items.get(position)
+        if item is None:
+            index = position if self._newest_first else self._count - 1 - position
+            item = self._items[position] = JournalItem(self._entries[index])
+            while len(self._items) > ITEM_CACHE:
+                self._items.popitem(last=False)
+        else:
+            self._items.move_to_end(position)
+        return item
+
+    def show(self, entries, newest_first=False):
+        """Show entries (oldest first unless newest_first).
+
+        If entries is the sequence already shown and one entry was
+        appended to it, only that new top row is announced.
+        """
+        old = self._count
+        if entries is self._entries and not newest_first and len(entries) == old + 1:
+            self._items = OrderedDict((p + 1, item) for p, item in self._items.items())
+            self._count += 1
+            self.items_changed(0, 0, 1)
             return
-        except FileNotFoundError:
-            continue
+        self._entries = entries
+        self._newest_first = newest_first
+        self._count = len(entries)
+        self._items.clear()
+        self.items_changed(0, old, self._count)
 
 
 class MainWindow(Adw.ApplicationWindow):
@@ -86,6 +165,17 @@ class MainWindow(Adw.ApplicationWindow):
         super().__init__(application=app, title=_("Emotion Map"))
         self.set_default_size(550, 700)
         self.journal = _load_journal()
+        self.stats = _load_stats()
+        startup.mark("load journal")
+        self._export_cancellable = None
+        self.search_index = None
+        self._index_loading = False
+        self._index_generation = 0
+        self._unindexed = []
+        self._save_error = None
+        if self.stats.rebuilt:
+            _save_stats(self.stats, self._on_saved)
+        self.connect("close-request", self._on_close_request)
 
         main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         self.set_content(main_box)
@@ -99,6 +189,7 @@ class MainWindow(Adw.ApplicationWindow):
 
         menu = Gio.Menu()
         menu.append(_("Export Journal"), "win.export")
+        menu.append(_("Print Journal"), "win.print")
         menu.append(_("About Emotion Map"), "app.about")
         menu.append(_("Quit"), "app.quit")
         menu_btn = Gtk.MenuButton(icon_name="open-menu-symbolic", menu_model=menu)
@@ -107,13 +198,16 @@ class MainWindow(Adw.ApplicationWindow):
         export_action = Gio.SimpleAction.new("export", None)
         export_action.connect("activate", lambda *_: self._on_export())
         self.add_action(export_action)
+        print_action = Gio.SimpleAction.new("print", None)
+        print_action.connect("activate", lambda *_: self._on_print())
+        self.add_action(print_action)
 
         ctrl = Gtk.EventControllerKey()
         ctrl.connect("key-pressed", self._on_key)
         self.add_controller(ctrl)
 
         # View stack
-        stack = Adw.ViewStack()
+        self.stack = stack = Adw.ViewStack()
         switcher = Adw.ViewSwitcherBar()
         switcher.set_stack(stack)
         switcher.set_reveal(True)
@@ -128,6 +222,17 @@ class MainWindow(Adw.ApplicationWindow):
         stack.add_titled(journal_page, "journal", _("Journal"))
         stack.get_page(journal_page).set_icon_name("document-edit-symbolic")
 
+        # Insights page
+        insights_page = self._build_insights_page()
+        stack.add_titled(insights_page, "insights", _("Insights"))
+        stack.get_page(insights_page).set_icon_name("view-list-bullet-symbolic")
+
+        # Chart page
+        chart_page = self._build_chart_page()
+        stack.add_titled(chart_page, "chart", _("Chart"))
+        stack.get_page(chart_page).set_icon_name("view-grid-symbolic")
+        stack.connect("notify::visible-child-name", self._on_page_changed)
+
         main_box.append(stack)
         main_box.append(switcher)
 
@@ -139,19 +244,45 @@ class MainWindow(Adw.ApplicationWindow):
         main_box.append(self.status)
         GLib.timeout_add_seconds(1, self._tick)
         self._tick()
+        startup.mark("build window")
 
     def _tick(self):
-        self.status.set_label(GLib.DateTime.new_now_local().format("%Y-%m-%d %H:%M:%S"))
+        self.status.set_label(self._save_error or
+                              GLib.DateTime.new_now_local().format("%Y-%m-%d %H:%M:%S"))
         return True
 
+    def _on_saved(self, error):
+        """Writer callback; keeps a failed save in the status bar until one succeeds."""
+        message = _("Could not save: %s") % error if error else None
+        if message != self._save_error:
+            self._save_error = message
+            self._tick()
+
     def _on_key(self, ctrl, keyval, keycode, state):
         if state & Gdk.ModifierType.CONTROL_MASK and keyval in (Gdk.KEY_e, Gdk.KEY_E):
             self._on_export()
             return True
+        if state & Gdk.ModifierType.CONTROL_MASK and keyval in (Gdk.KEY_p, Gdk.KEY_P):
+            self._on_print()
+            return True
         return False
 
     def _on_export(self):
-        show_export_dialog(self, self.journal, _("Emotion Journal"), lambda m: self.status.set_label(m))
+        from kanslokartan.export import show_export_dialog
+        self._export_cancellable = show_export_dialog(
+            self, journal.iter_display(_get_store().query_journal(), _), _("Emotion Journal"),
+            lambda m: self.status.set_label(m), fields=journal.DISPLAY_FIELDS)
+
+    def _on_print(self):
+        from kanslokartan.print_helper import print_report
+        get_writer().flush()
+        print_report(self, _("Emotion Journal"),
+                     list(journal.iter_display(_get_store().query_journal(), _)))
+
+    def _on_close_request(self, *_args):
+        if self._export_cancellable is not None:
+            self._export_cancellable.cancel()
+        return False
 
     def _build_emotions_page(self):
         scroll = Gtk.ScrolledWindow(vexpand=True)
@@ -196,15 +327,7 @@ class MainWindow(Adw.ApplicationWindow):
         return scroll
 
     def _on_emotion_clicked(self, btn, emoji, name, desc):
-        # Log to journal
-        entry = {
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-            "emotion": _(name),
-            "emoji": emoji,
-        }
-        self.journal.append(entry)
-        _save_journal(self.journal)
-        self._refresh_journal()
+        entry = journal.Entry(CODES[name])
 
         # Show strategies if available
         strategies = STRATEGIES.get(name, [])
@@ -216,10 +339,31 @@ class MainWindow(Adw.ApplicationWindow):
         dialog = Adw.AlertDialog.new(f"{emoji} {_(name)}", body)
         dialog.add_response("ok", _("OK"))
         dialog.add_response("speak", "🔊 " + _("Listen"))
-        dialog.connect("response", lambda d, r: _speak(_(name)) if r == "speak" else None)
+        note = Gtk.Entry(placeholder_text=_("Add a note (optional)"))
+        dialog.set_extra_child(note)
+        dialog.connect("response", self._on_emotion_response, entry, note)
         dialog.present(self)
 
-        self.status.set_label(_("Logged: %s %s") % (emoji, _(name)))
+    def _on_emotion_response(self, dialog, response, entry, note):
+        """Log the entry when its dialog closes, with the note if one was typed."""
+        entry.note = note.get_text().strip() or None
+        self._log_entry(entry)
+        if response == "speak":
+            _speak(_(entry.name))
+
+    def _log_entry(self, entry):
+        self.journal.append(entry)
+        _append_journal(entry, self._on_saved)
+        self.stats.add(entry)
+        _save_stats(self.stats, self._on_saved)
+        if self.chart is not None:
+            self.chart.add(entry)
+        if self.search_index is not None:
+            self.search_index.add(entry)
+        elif self._index_loading:
+            self._unindexed.append(entry)
+        self._on_search_changed()
+        self.status.set_label(_("Logged: %s %s") % (entry.emoji, _(entry.name)))
 
     def _build_journal_page(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
@@ -227,14 +371,48 @@ class MainWindow(Adw.ApplicationWindow):
         box.set_margin_start(12)
         box.set_margin_end(12)
 
-        title = Gtk.Label(label=_("Emotion Journal"))
+        header = Gtk.Box(spacing=6)
+        title = Gtk.Label(label=_("Emotion Journal"), hexpand=True)
         title.add_css_class("title-3")
-        box.append(title)
-
+        header.append(title)
+        search_btn = Gtk.ToggleButton(icon_name="system-search-symbolic",
+                                      tooltip_text=_("Search journal"))
+        header.append(search_btn)
+        box.append(header)
+
+        self.search_bar = Gtk.SearchBar()
+        filters = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.search_entry = Gtk.SearchEntry(placeholder_text=_("Search notes"))
+        self.search_entry.connect("search-changed", self._on_search_changed)
+        filters.append(self.search_entry)
+        row = Gtk.Box(spacing=6)
+        self.emotion_filter = Gtk.DropDown.new_from_strings(
+            [_("All emotions")] + [f"{emoji} {_(name)}" for emoji, name, _desc in EMOTIONS])
+        self.emotion_filter.connect("notify::selected", self._on_search_changed)
+        row.append(self.emotion_filter)
+        self.from_entry = Gtk.Entry(placeholder_text=_("From YYYY-MM-DD"), width_chars=12)
+        self.to_entry = Gtk.Entry(placeholder_text=_("To YYYY-MM-DD"), width_chars=12)
+        for date_entry in (self.from_entry, self.to_entry):
+            date_entry.connect("changed", self._on_search_changed)
+            row.append(date_entry)
+        filters.append(row)
+        self.search_bar.set_child(filters)
+        self.search_bar.connect_entry(self.search_entry)
+        search_btn.bind_property("active", self.search_bar, "search-mode-enabled",
+                                 GObject.BindingFlags.BIDIRECTIONAL)
+        self.search_bar.connect("notify::search-mode-enabled", self._on_search_changed)
+        box.append(self.search_bar)
+
+        # Rows are recycled by the factory and items are made on demand by
+        # the model, so only the visible entries ever have objects.
+        self.journal_model = JournalModel()
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", self._on_journal_row_setup)
+        factory.connect("bind", self._on_journal_row_bind)
         scroll = Gtk.ScrolledWindow(vexpand=True)
-        self.journal_list = Gtk.ListBox()
-        self.journal_list.add_css_class("boxed-list")
-        self.journal_list.set_selection_mode(Gtk.SelectionMode.NONE)
+        self.journal_list = Gtk.ListView(model=Gtk.NoSelection(model=self.journal_model),
+                                         factory=factory)
+        self.journal_list.add_css_class("rich-list")
         scroll.set_child(self.journal_list)
         box.append(scroll)
 
@@ -248,37 +426,233 @@ class MainWindow(Adw.ApplicationWindow):
         self._refresh_journal()
         return box
 
+    def _history(self):
+        """Return every known entry, oldest first: all of it once indexed."""
+        return self.search_index.entries if self.search_index is not None else self.journal
+
     def _refresh_journal(self):
-        child = self.journal_list.get_first_child()
-        while child:
-            nc = child.get_next_sibling()
-            self.journal_list.remove(child)
-            child = nc
-        for entry in reversed(self.journal[-50:]):
-            row = Adw.ActionRow()
-            row.set_title(f"{entry.get('emoji', '')} {entry.get('emotion', '')}")
-            row.set_subtitle(entry.get("date", ""))
-            self.journal_list.append(row)
+        self.journal_model.show(self._history())
+
+    def _filters(self):
+        """Return (code, start, end, text) for the search bar, or None if unused."""
+        if not self.search_bar.get_search_mode():
+            return None
+        selected = self.emotion_filter.get_selected()
+        code = CODES[EMOTIONS[selected - 1][1]] if 0 < selected <= len(EMOTIONS) else None
+        start = parse_date(self.from_entry.get_text())
+        end = parse_date(self.to_entry.get_text(), end=True)
+        text = self.search_entry.get_text().strip() or None
+        if code is None and start is None and end is None and text is None:
+            return None
+        return code, start, end, text
+
+    def _on_search_changed(self, *_args):
+        filters = self._filters()
+        if filters is None:
+            self._refresh_journal()
+            return
+        if self.search_index is None:
+            self._load_search_index()
+            return
+        code, start, end, text = filters
+        entries = self.search_index.query(code, start, end, text, limit=SEARCH_LIMIT)
+        self.journal_model.show(entries, newest_first=True)
+        self.status.set_label(_("%d matching entries") % len(entries))
+
+    def _load_search_index(self):
+        """Index the full history, archive included, on a worker thread."""
+        if self._index_loading:
+            return
+        self._index_loading = True
+        generation = self._index_generation
+        self.status.set_label(_("Loading journal history…"))
+
+        def load():
+            get_writer().flush()
+            index = JournalIndex(journal.load(_get_store().query_journal()))
+            GLib.idle_add(self._on_search_index_loaded, index, generation)
+
+        threading.Thread(target=load, name="kanslokartan-search-index", daemon=True).start()
+
+    def _on_search_index_loaded(self, index, generation):
+        if generation != self._index_generation:
+            index = JournalIndex()
+        for entry in self._unindexed:
+            if not index.contains(entry):
+                index.add(entry)
+        self._unindexed = []
+        self.search_index = index
+        self._index_loading = False
+        self.status.set_label("")
+        if self.chart is not None:
+            self.chart.set_entries(index.entries)
+        self._on_search_changed()
+        return False
+
+    def _on_journal_row_setup(self, factory, list_item):
+        row = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
+        title = Gtk.Label(xalign=0)
+        title.add_css_class("heading")
+        subtitle = Gtk.Label(xalign=0)
+        subtitle.add_css_class("dim-label")
+        subtitle.add_css_class("caption")
+        row.append(title)
+        row.append(subtitle)
+        list_item.set_child(row)
+
+    def _on_journal_row_bind(self, factory, list_item):
+        item = list_item.get_item()
+        title = list_item.get_child().get_first_child()
+        title.set_label(item.title)
+        title.get_next_sibling().set_label(item.subtitle)
 
     def _on_clear_journal(self, *_args):
         self.journal = []
-        _save_journal(self.journal)
-        self._refresh_journal()
+        _clear_journal(self._on_saved)
+        self.journal_model.show([])
+        self._index_generation += 1
+        self._unindexed = []
+        if self.search_index is not None:
+            self.search_index = JournalIndex()
+        if self.chart is not None:
+            self.chart.set_entries([])
+        self.stats.clear()
+        _save_stats(self.stats, self._on_saved)
+
+    def _build_insights_page(self):
+        scroll = Gtk.ScrolledWindow(vexpand=True)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        box.set_margin_top(12)
+        box.set_margin_start(12)
+        box.set_margin_end(12)
+        box.set_margin_bottom(12)
+
+        title = Gtk.Label(label=_("Insights"))
+        title.add_css_class("title-3")
+        box.append(title)
+
+        self.insight_lists = {}
+        for key, heading in [("today", _("Today")), ("week", _("This week")),
+                             ("total", _("All time")), ("hours", _("Time of day"))]:
+            label = Gtk.Label(label=heading, xalign=0)
+            label.add_css_class("heading")
+            label.set_margin_top(8)
+            box.append(label)
+            lst = Gtk.ListBox()
+            lst.add_css_class("boxed-list")
+            lst.set_selection_mode(Gtk.SelectionMode.NONE)
+            box.append(lst)
+            self.insight_lists[key] = lst
+
+        scroll.set_child(box)
+        return scroll
+
+    def _build_chart_page(self):
+        """Build the Chart page shell; the chart itself waits for _ensure_chart."""
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        box.set_margin_top(12)
+        box.set_margin_start(12)
+        box.set_margin_end(12)
+        box.set_margin_bottom(12)
+
+        title = Gtk.Label(label=_("Mood over time"))
+        title.add_css_class("title-3")
+        box.append(title)
+
+        self.chart = None
+        self.chart_box = box
+        return box
+
+    def _ensure_chart(self):
+        """Create the chart the first time its page is shown.
+
+        Importing it pulls in cairo and Pango, which startup defers.
+        """
+        if self.chart is None:
+            from kanslokartan.chart import MoodChart
+            self.chart = MoodChart(self._history())
+            self.chart_box.append(self.chart)
+
+    def _on_page_changed(self, *_args):
+        self._refresh_insights()
+        # The journal list and chart start with the recent entries and switch
+        # to the full history, archive included, once it has been indexed.
+        page = self.stack.get_visible_child_name()
+        if page == "chart":
+            self._ensure_chart()
+        if page in ("chart", "journal") and self.search_index is None:
+            self._load_search_index()
+
+    def _refresh_insights(self):
+        """Rebuild the Insights rows from the rollups; O(buckets)."""
+        if self.stack.get_visible_child_name() != "insights":
+            return
+        day, week, _hour = self.stats.current_keys()
+
+        def ranked(counts=None):
+            return [(journal.label(e, _), str(n)) for e, n in self.stats.top(counts)]
+
+        sections = {
+            "today": ranked(self.stats.day(day)),
+            "week": ranked(self.stats.week(week)),
+            "total": ranked(),
+            "hours": [],
+        }
+        for hour in range(24):
+            top = self.stats.top(self.stats.hour(hour), 1)
+            if top:
+                code, n = top[0]
+                label = journal.label(code, _)
+                sections["hours"].append((f"{hour:02d}:00", "%s (%d)" % (label, n)))
+        for key, rows in sections.items():
+            lst = self.insight_lists[key]
+            lst.remove_all()
+            if not rows:
+                rows = [(_("No entries yet"), "")]
+            for title, subtitle in rows:
+                row = Adw.ActionRow(title=title, subtitle=subtitle)
+                lst.append(row)
 
 
 class App(Adw.Application):
     def __init__(self):
         super().__init__(application_id=APP_ID)
+        self._warm_stop = None
         self.connect("activate", self._on_activate)
+        self.connect("shutdown", self._on_shutdown)
 
     def _on_activate(self, *_args):
-        win = self.props.active_window or MainWindow(self)
+        startup.mark("activate")
+        win = self.props.active_window
+        if win is None:
+            win = MainWindow(self)
+            startup.watch_window(win)
         self._add_action("about", self._on_about)
         quit_a = Gio.SimpleAction(name="quit")
         quit_a.connect("activate", lambda *_: self.quit())
         self.add_action(quit_a)
         self.set_accels_for_action("app.quit", ["<Control>q"])
         win.present()
+        if self._warm_stop is None:
+            self._warm_stop = threading.Event()
+            GLib.timeout_add_seconds(5, self._start_speech_warm_up, priority=GLib.PRIORITY_LOW)
+
+    def _start_speech_warm_up(self):
+        """Fill the speech cache in the background once the UI is idle."""
+        from kanslokartan.speech import current_language, available_languages, warm_up
+        first = current_language()
+        languages = [first] + [lang for lang in available_languages() if lang != first]
+        threading.Thread(target=warm_up, args=(languages, self._warm_stop),
+                         kwargs={"speaker": _get_speaker()},
+                         name="kanslokartan-tts-warm-up", daemon=True).start()
+        return False
+
+    def _on_shutdown(self, *_args):
+        if self._warm_stop is not None:
+            self._warm_stop.set()
+        get_writer().close()
+        if _speaker is not None:
+            _speaker.close()
 
     def _add_action(self, name, cb):
         a = Gio.SimpleAction(name=name)
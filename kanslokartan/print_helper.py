@@ -9,8 +9,37 @@ except Exception:
     pass
 
 
-def print_to_pdf(widget, title="Document", output_dir=None):
-    """Save widget content as PDF using Gtk.PrintOperation."""
+def _connect_report(print_op, title, items):
+    """Paginate items when printing begins and draw each page on request."""
+    from kanslokartan.report import ReportLayout
+    state = {}
+
+    def on_begin_print(op, context):
+        layout = ReportLayout(title, context.get_width(), context.get_height())
+        state["layout"] = layout
+        op.set_n_pages(len(layout.pages(items)))
+
+    def on_draw_page(op, context, page_nr):
+        layout = state["layout"]
+        layout.draw_page(context.get_cairo_context(), layout.pages(items)[page_nr], page_nr + 1)
+
+    print_op.connect("begin-print", on_begin_print)
+    print_op.connect("draw-page", on_draw_page)
+
+
+def print_report(window, title, items):
+    """Show the print dialog for items as a paginated report."""
+    print_op = Gtk.PrintOperation()
+    print_op.set_job_name(title)
+    _connect_report(print_op, title, items)
+    try:
+        print_op.run(Gtk.PrintOperationAction.PRINT_DIALOG, window)
+    except GLib.Error as e:
+        print(f"Printing failed: {e}")
+
+
+def print_to_pdf(widget, title="Document", output_dir=None, items=()):
+    """Save items as a paginated PDF report using Gtk.PrintOperation."""
     if output_dir is None:
         output_dir = GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_DOCUMENTS) or os.path.expanduser("~")
     
@@ -20,17 +49,7 @@ def print_to_pdf(widget, title="Document", output_dir=None):
     
     print_op = Gtk.PrintOperation()
     print_op.set_export_filename(filepath)
-    
-    def on_draw_page(op, context, page_nr):
-        cr = context.get_cairo_context()
-        cr.set_source_rgb(0, 0, 0)
-        cr.select_font_face("Sans")
-        cr.set_font_size(12)
-        cr.move_to(72, 72)
-        cr.show_text(f"{title} — {time.strftime('%Y-%m-%d %H:%M')}")
-        
-    print_op.connect("draw-page", on_draw_page)
-    print_op.set_n_pages(1)
+    _connect_report(print_op, title, items)
     
     try:
         result = print_op.run(Gtk.PrintOperationAction.EXPORT, None)
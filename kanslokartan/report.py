@@ -0,0 +1,150 @@
+"""Paginated PDF reports for Emotion Map.
+
+Rows are measured once with Pango and split into pages as they stream in;
+each page is drawn straight onto the PDF surface or a Gtk.PrintOperation
+context, so only one page of rows is held at a time.
+"""
+
+import os
+import time
+from datetime import datetime
+
+import gettext
+_ = gettext.gettext
+
+import cairo
+import gi
+gi.require_version("Pango", "1.0")
+gi.require_version("PangoCairo", "1.0")
+gi.require_foreign("cairo")
+from gi.repository import Pango, PangoCairo
+
+from kanslokartan import __version__
+
+APP_LABEL = _("Emotion Map")
+WEBSITE = "www.autismappar.se"
+A4 = (595, 842)
+HEADER = 70
+
+
+def _row_text(item):
+    if isinstance(item, dict):
+        return " | ".join(str(v) for v in item.values() if v != "")
+    return str(item)
+
+
+class ReportLayout:
+    """Pango pagination of report rows for one page size."""
+
+    def __init__(self, title, width=A4[0], height=A4[1], margin=40, font="Sans 10"):
+        self.title = title
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.font = Pango.FontDescription.from_string(font)
+        self.title_font = Pango.FontDescription.from_string("Sans Bold 18")
+        self.footer_font = Pango.FontDescription.from_string("Sans 8")
+        self.date = datetime.now().strftime("%Y-%m-%d")
+        self._pages = None
+        self._measure = Pango.Layout.new(PangoCairo.FontMap.get_default().create_context())
+        self._measure.set_font_description(self.font)
+        self._measure.set_width(self._pango_width())
+        self._measure.set_wrap(Pango.WrapMode.WORD_CHAR)
+
+    def _pango_width(self):
+        return int((self.width - 2 * self.margin) * Pango.SCALE)
+
+    def paginate(self, items):
+        """Yield pages as lists of (text, height) rows.
+
+        The first page is always produced so an empty report still gets
+        its title and footer.
+        """
+        bottom = self.height - self.margin - 20
+        page, y, first = [], self.margin + HEADER, True
+        for item in items:
+            text = _row_text(item)
+            self._measure.set_text(text, -1)
+            h = self._measure.get_pixel_size()[1] + 4
+            if page and y + h > bottom:
+                yield page
+                page, y, first = [], self.margin, False
+            page.append((text, h))
+            y += h
+        if page or first:
+            yield page
+
+    def pages(self, items):
+        """Paginate once and cache the result for repeated rendering."""
+        if self._pages is None:
+            self._pages = list(self.paginate(items))
+        return self._pages
+
+    def _layout(self, cr, font, text):
+        layout = PangoCairo.create_layout(cr)
+        layout.set_font_description(font)
+        layout.set_width(self._pango_width())
+        layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        layout.set_text(text, -1)
+        return layout
+
+    def draw_page(self, cr, rows, number):
+        """Draw one page of rows onto the cairo context cr."""
+        cr.set_source_rgb(0, 0, 0)
+        y = self.margin
+        if number == 1:
+            cr.move_to(self.margin, y)
+            PangoCairo.show_layout(cr, self._layout(cr, self.title_font, self.title))
+            cr.move_to(self.margin, y + 35)
+            PangoCairo.show_layout(cr, self._layout(cr, self.font, self.date))
+            y += HEADER
+        row = self._layout(cr, self.font, "")
+        for text, h in rows:
+            row.set_text(text, -1)
+            cr.move_to(self.margin, y)
+            PangoCairo.show_layout(cr, row)
+            y += h
+        cr.set_source_rgb(0.5, 0.5, 0.5)
+        cr.move_to(self.margin, self.height - self.margin)
+        footer = f"{APP_LABEL} v{__version__} — {WEBSITE} — {self.date} — {number}"
+        PangoCairo.show_layout(cr, self._layout(cr, self.footer_font, footer))
+
+
+def write_pdf(items, title, output_path, width=A4[0], height=A4[1]):
+    """Stream items into a paginated PDF; returns the number of pages."""
+    layout = ReportLayout(title, width, height)
+    surface = cairo.PDFSurface(output_path, width, height)
+    cr = cairo.Context(surface)
+    count = 0
+    try:
+        for count, rows in enumerate(layout.paginate(items), 1):
+            layout.draw_page(cr, rows, count)
+            surface.show_page()
+    finally:
+        surface.finish()
+    return count
+
+
+def benchmark(entries=10000, output_path=None):
+    """Time a report over synthetic journal entries; returns pages per second."""
+    import tempfile
+    items = ({"date": f"2026-01-01 {i % 24:02d}:{i % 60:02d}", "emotion": "Happy",
+              "emoji": "\U0001f60a", "note": "x" * (i % 120)} for i in range(entries))
+    temporary = output_path is None
+    if temporary:
+        fd, output_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+    start = time.perf_counter()
+    try:
+        pages = write_pdf(items, "Benchmark", output_path)
+    finally:
+        if temporary:
+            os.unlink(output_path)
+    elapsed = time.perf_counter() - start
+    rate = pages / elapsed
+    print(f"{entries} entries, {pages} pages in {elapsed:.2f}s: {rate:.1f} pages/s")
+    return rate
+
+
+if __name__ == "__main__":
+    benchmark()
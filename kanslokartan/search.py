@@ -0,0 +1,168 @@
+"""Indexed search over the full journal history.
+
+Entries are kept in time order next to a sorted list of their timestamps,
+so a date range is two bisects. Each emotion code has a posting list of
+entry positions and each lowercased note word maps to the positions of
+the notes containing it; the words are also kept sorted, so a prefix is
+two bisects too. A query intersects only the lists it needs and never
+scans the whole journal or vocabulary. New entries are appended to every
+index in O(1) (amortised) when they arrive in time order, as journal
+entries do; only a word never seen before costs a sorted insert.
+"""
+
+import re
+import time
+from bisect import bisect_left, bisect_right, insort
+
+_WORD = re.compile(r"\w+")
+# Sorts after every character a word can contain.
+_LAST = "\U0010ffff"
+
+
+def _words(text):
+    return _WORD.findall(text.lower()) if text else []
+
+
+class JournalIndex:
+    """Timestamp, emotion and note-word indexes over journal.Entry objects."""
+
+    def __init__(self, entries=()):
+        self._build(entries)
+
+    def _build(self, entries):
+        self.entries = []
+        self.times = []
+        self.postings = {}
+        self.words = {}
+        self.vocabulary = None
+        for entry in sorted(entries, key=lambda e: e.when):
+            self._append(entry)
+        self.vocabulary = sorted(self.words)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _append(self, entry):
+        position = len(self.entries)
+        self.entries.append(entry)
+        self.times.append(entry.when)
+        self.postings.setdefault(entry.code, []).append(position)
+        for word in set(_words(entry.note)):
+            positions = self.words.get(word)
+            if positions is None:
+                positions = self.words[word] = []
+                if self.vocabulary is not None:
+                    insort(self.vocabulary, word)
+            positions.append(position)
+
+    def add(self, entry):
+        """Index one new entry."""
+        if not self.times or entry.when >= self.times[-1]:
+            self._append(entry)
+        else:
+            self._build(self.entries + [entry])
+
+    def contains(self, entry):
+        lo = bisect_left(self.times, entry.when)
+        hi = bisect_right(self.times, entry.when)
+        return any(e.code == entry.code and e.note == entry.note for e in self.entries[lo:hi])
+
+    def _note_positions(self, text):
+        """Return sorted positions whose note has a word starting with each query word."""
+        result = None
+        for query in set(_words(text)):
+            found = set()
+            lo = bisect_left(self.vocabulary, query)
+            hi = bisect_left(self.vocabulary, query + _LAST, lo)
+            for word in self.vocabulary[lo:hi]:
+                found.update(self.words[word])
+            result = found if result is None else result & found
+            if not result:
+                return []
+        return sorted(result or ())
+
+    def query(self, code=None, start=None, end=None, text=None, limit=None):
+        """Return matching entries, newest first.
+
+        start and end are epoch seconds (end exclusive); text matches notes
+        word by word, by prefix.
+        """
+        lo = 0 if start is None else bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect_left(self.times, end)
+        if lo >= hi:
+            return []
+        candidates = None
+        if code is not None:
+            postings = self.postings.get(code, [])
+            candidates = postings[bisect_left(postings, lo):bisect_left(postings, hi)]
+        if text and _words(text):
+            notes = self._note_positions(text)
+            notes = notes[bisect_left(notes, lo):bisect_left(notes, hi)]
+            candidates = notes if candidates is None else sorted(set(candidates) & set(notes))
+        if candidates is None:
+            candidates = range(lo, hi)
+        positions = reversed(candidates)
+        if limit is not None:
+            positions = (p for _n, p in zip(range(limit), positions))
+        return [self.entries[p] for p in positions]
+
+
+def parse_date(text, end=False):
+    """Return epoch seconds for a YYYY-MM-DD day, or None.
+
+    With end=True the result is the start of the following day, so the
+    given day is included in an exclusive range end.
+    """
+    try:
+        day = time.strptime(text.strip(), "%Y-%m-%d")
+    except ValueError:
+        return None
+    return int(time.mktime(day)) + (86400 if end else 0)
+
+
+def benchmark(entries=100_000, queries=200, vocabulary=50_000):
+    """Time typical queries against a generated journal.
+
+    Notes draw from the common words plus a large generated vocabulary, as
+    years of free-text notes would.
+    """
+    import random
+
+    from kanslokartan.journal import Entry
+
+    rng = random.Random(0)
+    words = ["school", "lunch", "friend", "football", "homework", "dog", "rain", "music"]
+    letters = "abcdefghijklmnopqrstuvwxyzåäö"
+    pool = words + ["".join(rng.choices(letters, k=rng.randint(3, 10)))
+                    for _ in range(vocabulary)]
+    start = int(time.time()) - entries * 1800
+    t0 = time.perf_counter()
+    index = JournalIndex(Entry(rng.randint(1, 12), start + i * 1800,
+                               " ".join(rng.choice(words) if rng.random() < 0.5 else
+                                        rng.choice(pool) for _ in range(3))
+                               if rng.random() < 0.3 else None)
+                         for i in range(entries))
+    print(f"built index over {entries} entries and {len(index.vocabulary)} words "
+          f"in {time.perf_counter() - t0:.3f} s")
+    span = entries * 1800
+    cases = {
+        "emotion": lambda: index.query(code=rng.randint(1, 12), limit=500),
+        "week": lambda: index.query(start=(s := start + rng.randrange(span)), end=s + 7 * 86400),
+        "emotion + month": lambda: index.query(code=rng.randint(1, 12),
+                                               start=(s := start + rng.randrange(span)),
+                                               end=s + 30 * 86400),
+        "note word": lambda: index.query(text=rng.choice(words)[:4], limit=500),
+        "rare prefix": lambda: index.query(text=rng.choice(pool)[:3], limit=500),
+        "all filters": lambda: index.query(code=rng.randint(1, 12), text=rng.choice(words),
+                                           start=(s := start + rng.randrange(span)),
+                                           end=s + 90 * 86400),
+    }
+    for label, run in cases.items():
+        t0 = time.perf_counter()
+        for _ in range(queries):
+            run()
+        print(f"{label}: {(time.perf_counter() - t0) / queries * 1000:.2f} ms per query")
+
+
+if __name__ == "__main__":
+    benchmark()
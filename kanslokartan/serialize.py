@@ -0,0 +1,106 @@
+"""Export serializers for Emotion Map.
+
+Kept free of GTK so the command line exporter can use them headless.
+"""
+
+import csv
+import io
+import json
+
+import gettext
+_ = gettext.gettext
+
+from kanslokartan import __version__
+
+APP_LABEL = _("Emotion Map")
+AUTHOR = "Daniel Nylander"
+WEBSITE = "www.autismappar.se"
+
+FORMATS = ("csv", "json", "ndjson")
+
+
+def _columns(items):
+    fields = {}
+    for item in items:
+        fields.update(dict.fromkeys(item))
+    return list(fields)
+
+
+def iter_csv(items, fields=None):
+    """Yield CSV text for items one row at a time.
+
+    fields is the column schema; rows are written by key with missing
+    fields left empty, and a field outside the schema raises ValueError
+    rather than being dropped. Without a schema the columns are the union
+    of every item's keys, which means reading all items first.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def take():
+        value = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return value
+
+    if fields is None:
+        items = list(items)
+        fields = _columns(items)
+    if fields:
+        rows = csv.DictWriter(output, fields, restval="")
+        rows.writeheader()
+        yield take()
+        for item in items:
+            rows.writerow(item)
+            yield take()
+    writer.writerow([])
+    writer.writerow([f"{APP_LABEL} v{__version__} — {WEBSITE}"])
+    yield take()
+
+
+def iter_json(items):
+    """Yield JSON text for items one record at a time."""
+    yield '{\n  "data": ['
+    sep = "\n    "
+    for item in items:
+        yield sep + json.dumps(item, ensure_ascii=False)
+        sep = ",\n    "
+    yield "\n  ],\n"
+    meta = {
+        "_exported_by": f"{APP_LABEL} v{__version__}",
+        "_author": AUTHOR,
+        "_website": WEBSITE,
+    }
+    yield ",\n".join(f"  {json.dumps(k)}: {json.dumps(v, ensure_ascii=False)}"
+                      for k, v in meta.items())
+    yield "\n}\n"
+
+
+def data_to_csv(items, label="", fields=None):
+    """Export data as CSV."""
+    return "".join(iter_csv(items, fields))
+
+
+def data_to_json(items, label=""):
+    """Export data as JSON."""
+    return "".join(iter_json(items))
+
+
+def iter_ndjson(items):
+    """Yield one JSON document per line."""
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False) + "\n"
+
+
+def iter_format(items, fmt, fields=None):
+    """Yield items serialized as csv, json or ndjson.
+
+    fields is the CSV column schema; the other formats ignore it.
+    """
+    if fmt == "csv":
+        return iter_csv(items, fields)
+    if fmt == "json":
+        return iter_json(items)
+    if fmt == "ndjson":
+        return iter_ndjson(items)
+    raise ValueError(f"unknown format: {fmt}")
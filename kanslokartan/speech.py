@@ -0,0 +1,241 @@
+"""Text to speech with a persistent synthesis worker and an on-disk cache.
+
+One piper process per voice is started on first use and fed JSON requests
+over its stdin, so each voice model is loaded once per session. Playback
+and cache warm-up share the same Speaker, and therefore the same piper
+processes. Every synthesized
+phrase is kept as a WAV file keyed by text, voice and locale, so repeated
+phrases play straight from the cache. espeak-ng is used when piper is not
+installed.
+"""
+
+import gettext
+import glob
+import hashlib
+import json
+import locale
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+
+# Language -> (piper model, espeak-ng voice)
+VOICES = {
+    "sv": ("sv_SE-nst-medium", "sv"),
+    "en": ("en_US-lessac-medium", "en"),
+}
+DEFAULT_LANGUAGE = "sv"
+PLAYERS = (["pw-play"], ["paplay"], ["aplay", "-q"])
+LOCALE_DIRS = (os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "po"),
+               "/usr/share/locale")
+
+
+def cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "kanslokartan", "tts")
+
+
+def current_language():
+    lang = (locale.getlocale(locale.LC_MESSAGES)[0] or os.environ.get("LANG") or "")[:2]
+    return lang if lang in VOICES else DEFAULT_LANGUAGE
+
+
+class Speaker:
+    """Synthesizes on a worker thread and plays cached audio."""
+
+    def __init__(self, language=None, directory=None):
+        self.language = language or current_language()
+        self.model, self.espeak_voice = VOICES.get(self.language, VOICES[DEFAULT_LANGUAGE])
+        self.directory = directory or cache_dir()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pipers = {}
+        self._lock = threading.Lock()
+        # Serializes synthesis so the worker and a warm-up thread take turns
+        # on the same piper process.
+        self._synth_lock = threading.Lock()
+
+    def cache_path(self, text, engine, language=None):
+        language = language or self.language
+        model, espeak_voice = VOICES.get(language, VOICES[DEFAULT_LANGUAGE])
+        voice = model if engine == "piper" else espeak_voice
+        key = hashlib.sha256(f"{engine}\0{voice}\0{language}\0{text}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def cached(self, text, language=None):
+        """Return the cached WAV for text, if any engine has made one."""
+        for engine in ("piper", "espeak-ng"):
+            path = self.cache_path(text, engine, language)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def speak(self, text):
+        """Play text, synthesizing it in the background if needed."""
+        path = self.cached(text)
+        if path:
+            _play(path)
+        else:
+            self._submit(text, True)
+
+    def _submit(self, text, play):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="kanslokartan-tts",
+                                                daemon=True)
+                self._thread.start()
+        self._queue.put((text, play))
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            text, play = request
+            path = self.synthesize(text)
+            if path and play:
+                _play(path)
+
+    def synthesize(self, text, language=None):
+        """Return a cached WAV for text, making it first if needed."""
+        language = language or self.language
+        with self._synth_lock:
+            path = self.cached(text, language)
+            if path:
+                return path
+            os.makedirs(self.directory, exist_ok=True)
+            for engine, make in (("piper", self._piper_synth), ("espeak-ng", self._espeak_synth)):
+                path = self.cache_path(text, engine, language)
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".wav")
+                os.close(fd)
+                try:
+                    if make(text, tmp, language):
+                        os.replace(tmp, path)
+                        return path
+                finally:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+        return None
+
+    def _piper_synth(self, text, output, language):
+        model = VOICES.get(language, VOICES[DEFAULT_LANGUAGE])[0]
+        piper = self._pipers.get(model)
+        if piper is None or piper.poll() is not None:
+            if not shutil.which("piper"):
+                return False
+            piper = self._pipers[model] = subprocess.Popen(
+                ["piper", "--model", model, "--json-input"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, bufsize=1)
+        request = {"text": " ".join(text.split()), "output_file": output}
+        try:
+            piper.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+            piper.stdin.flush()
+            # piper prints the path of each finished file on its own line.
+            done = piper.stdout.readline()
+        except (OSError, ValueError):
+            done = ""
+        return bool(done) and os.path.getsize(output) > 0
+
+    def _espeak_synth(self, text, output, language):
+        voice = VOICES.get(language, VOICES[DEFAULT_LANGUAGE])[1]
+        try:
+            subprocess.run(["espeak-ng", "-v", voice, "-w", output, text],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            return False
+        return os.path.getsize(output) > 0
+
+    def release(self, language):
+        """Stop the piper process of another language's voice."""
+        model = VOICES.get(language, VOICES[DEFAULT_LANGUAGE])[0]
+        if model == self.model:
+            return
+        with self._synth_lock:
+            piper = self._pipers.pop(model, None)
+        if piper is not None:
+            _stop(piper)
+
+    def close(self):
+        """Stop the worker and the piper processes."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(1)
+        for piper in self._pipers.values():
+            _stop(piper)
+        self._pipers.clear()
+
+
+def _stop(piper):
+    try:
+        piper.stdin.close()
+    except OSError:
+        pass
+    piper.terminate()
+
+
+def _play(path):
+    for cmd in PLAYERS:
+        try:
+            subprocess.Popen(cmd + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return
+        except FileNotFoundError:
+            continue
+
+
+def available_languages():
+    """Return languages with both a voice and a translation, plus English."""
+    found = {"en"}
+    for d in LOCALE_DIRS:
+        found.update(os.path.basename(p)[:-3] for p in glob.glob(os.path.join(d, "*.po")))
+        found.update(p.split(os.sep)[-3]
+                     for p in glob.glob(os.path.join(d, "*", "LC_MESSAGES", "kanslokartan.mo")))
+    return sorted(lang for lang in {f[:2] for f in found} if lang in VOICES)
+
+
+def phrases(language):
+    """Return every speakable phrase translated into language."""
+    from kanslokartan.emotions import phrases as all_phrases
+    translation = gettext.NullTranslations()
+    for d in LOCALE_DIRS:
+        try:
+            translation = gettext.translation("kanslokartan", d, languages=[language])
+            break
+        except OSError:
+            continue
+    return all_phrases(translation.gettext)
+
+
+def warm_up(languages=None, stop=None, progress=None, speaker=None):
+    """Synthesize all phrases into the cache; returns how many were made.
+
+    Runs at the lowest CPU priority. stop is an optional threading.Event
+    checked between phrases. Pass the app's speaker to share its piper
+    processes; otherwise a private one is used and closed afterwards.
+    """
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+    own = speaker is None
+    if own:
+        speaker = Speaker()
+    made = 0
+    try:
+        for language in languages or available_languages():
+            try:
+                for text in phrases(language):
+                    if stop is not None and stop.is_set():
+                        return made
+                    if not speaker.cached(text, language) and speaker.synthesize(text, language):
+                        made += 1
+                        if progress:
+                            progress(language, text)
+            finally:
+                speaker.release(language)
+    finally:
+        if own:
+            speaker.close()
+    return made
@@ -0,0 +1,154 @@
+"""Incremental mood statistics for the emotion journal.
+
+Counts per emotion code are kept in day, ISO week and hour-of-day buckets
+and persisted next to the journal, so summaries cost O(buckets) to read and
+O(1) to update instead of rescanning every entry.
+"""
+
+import json
+import threading
+from datetime import datetime
+
+from kanslokartan.writer import write_atomic
+
+VERSION = 2
+
+
+def _buckets(when):
+    """Return (day, week, hour) keys for a datetime."""
+    year, week, _day = when.isocalendar()
+    return when.strftime("%Y-%m-%d"), f"{year}-W{week:02d}", f"{when.hour:02d}"
+
+
+class Rollups:
+    """Emotion counts per day, week and hour of day."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.rebuilt = False
+        self.clear()
+
+    @classmethod
+    def load(cls, path, journal=()):
+        """Load persisted rollups, rebuilding them from journal if needed.
+
+        journal is only iterated for a rebuild, so it can be a lazy stream
+        over the full history; rebuilt is set when that happened.
+        """
+        rollups = cls(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != VERSION:
+                raise ValueError("old rollup version")
+            rollups.totals = data["totals"]
+            rollups.days = data["days"]
+            rollups.weeks = data["weeks"]
+            rollups.hours = data["hours"]
+        except (OSError, ValueError, KeyError):
+            for entry in journal:
+                rollups.add(entry)
+            rollups.rebuilt = True
+        return rollups
+
+    def clear(self):
+        with self._lock:
+            self.totals = {}
+            self.days = {}
+            self.weeks = {}
+            self.hours = {}
+
+    def add(self, entry):
+        """Count one journal.Entry."""
+        day, week, hour = _buckets(datetime.fromtimestamp(entry.when))
+        emotion = str(entry.code)
+        with self._lock:
+            self.totals[emotion] = self.totals.get(emotion, 0) + 1
+            for table, key in ((self.days, day), (self.weeks, week), (self.hours, hour)):
+                counts = table.setdefault(key, {})
+                counts[emotion] = counts.get(emotion, 0) + 1
+
+    def save(self):
+        """Write the rollups atomically; safe to call from the writer thread."""
+        with self._lock:
+            text = json.dumps({"version": VERSION, "totals": self.totals, "days": self.days,
+                               "weeks": self.weeks, "hours": self.hours},
+                              ensure_ascii=False, separators=(",", ":"))
+        write_atomic(self.path, text)
+
+    def top(self, counts=None, n=None):
+        """Return (emotion code, count) pairs, most frequent first."""
+        with self._lock:
+            pairs = sorted((counts if counts is not None else self.totals).items(),
+                           key=lambda kv: (-kv[1], kv[0]))
+        return pairs if n is None else pairs[:n]
+
+    def day(self, day):
+        with self._lock:
+            return dict(self.days.get(day, {}))
+
+    def week(self, week):
+        with self._lock:
+            return dict(self.weeks.get(week, {}))
+
+    def hour(self, hour):
+        with self._lock:
+            return dict(self.hours.get(f"{hour:02d}", {}))
+
+    def current_keys(self, when=None):
+        """Return the (day, week, hour) keys for when (default: now)."""
+        return _buckets(when or datetime.now())
+
+
+DAY, WEEK, MONTH = LEVELS = (0, 1, 2)
+
+
+def bucket_keys(when):
+    """Return the (day, week, month) bucket numbers for epoch seconds.
+
+    Days are proleptic ordinals in local time, weeks start on Monday and
+    months count from year 0, so each level's keys are contiguous integers.
+    """
+    day = datetime.fromtimestamp(when).date()
+    ordinal = day.toordinal()
+    return ordinal, (ordinal - 1) // 7, day.year * 12 + day.month - 1
+
+
+class MoodBins:
+    """Per-code entry counts in day, week and month buckets for charts.
+
+    add() reports which buckets changed and whether a level's peak rose,
+    so a renderer can redraw only what is affected.
+    """
+
+    def __init__(self, size, entries=()):
+        self.size = size
+        self.levels = ({}, {}, {})
+        self.peaks = [0, 0, 0]
+        self.first = [None, None, None]
+        self.last = [None, None, None]
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        """Count one journal.Entry; returns [(level, key, peak_rose, extended)]."""
+        changed = []
+        for level, key in zip(LEVELS, bucket_keys(entry.when)):
+            counts = self.levels[level].setdefault(key, [0] * self.size)
+            if 0 <= entry.code < self.size:
+                counts[entry.code] += 1
+            total = sum(counts)
+            rose = total > self.peaks[level]
+            if rose:
+                self.peaks[level] = total
+            extended = self.first[level] is None or key < self.first[level]
+            if extended:
+                self.first[level] = key
+            if self.last[level] is None or key > self.last[level]:
+                self.last[level] = key
+            changed.append((level, key, rose, extended))
+        return changed
+
+    def counts(self, level, key):
+        return self.levels[level].get(key)
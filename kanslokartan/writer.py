@@ -0,0 +1,180 @@
+"""Background persistence worker.
+
+The UI hands mutations to a single writer thread instead of touching the
+disk itself. Jobs are debounced briefly so a burst of clicks turns into one
+write, and completion callbacks are posted back to the GTK main loop.
+
+Identical copies live in both apps (enforced by the Check workflow).
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEBOUNCE = 0.25
+
+
+def write_atomic(path, text):
+    """Write text to path via a temp file and rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_json_atomic(path, data, indent=2):
+    write_atomic(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+class _Job:
+    __slots__ = ("func", "args", "items", "callbacks")
+
+    def __init__(self, func, args, items):
+        self.func = func
+        self.args = args
+        self.items = items
+        self.callbacks = []
+
+
+class Writer:
+    """Single worker thread running coalesced write jobs in order."""
+
+    def __init__(self, delay=DEBOUNCE):
+        self._delay = delay
+        self._cond = threading.Condition()
+        self._pending = []
+        self._keyed = {}
+        self._busy = False
+        self._closed = False
+        self._flushing = False
+        self._thread = None
+
+    def submit(self, key, func, *args, on_done=None):
+        """Queue func(*args); a later job with the same key replaces it."""
+        with self._cond:
+            self._check_open()
+            job = self._keyed.get(key) if key is not None else None
+            if job is None:
+                job = self._add(key, _Job(func, args, None))
+            else:
+                job.func, job.args = func, args
+            self._queue(job, on_done)
+
+    def append(self, key, func, item, on_done=None):
+        """Queue item; consecutive items under key go to one func(items) call."""
+        with self._cond:
+            self._check_open()
+            job = self._keyed.get(key)
+            if job is None or self._pending[-1] is not job:
+                # Never reorder an append past a job queued after it.
+                job = self._add(key, _Job(func, (), []))
+            job.items.append(item)
+            self._queue(job, on_done)
+
+    def _add(self, key, job):
+        self._pending.append(job)
+        if key is not None:
+            self._keyed[key] = job
+        return job
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("writer is closed")
+
+    def _queue(self, job, on_done):
+        if on_done is not None:
+            job.callbacks.append(on_done)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="kanslokartan-writer",
+                                            daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Let the rest of a burst arrive before writing. Every
+                # submit notifies the condition, so wait out the deadline
+                # rather than returning on the first wakeup.
+                deadline = time.monotonic() + self._delay
+                while not (self._closed or self._flushing):
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                jobs = self._pending
+                self._pending = []
+                self._keyed.clear()
+                self._busy = True
+            for job in jobs:
+                self._execute(job)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _execute(self, job):
+        error = None
+        try:
+            if job.items is None:
+                job.func(*job.args)
+            else:
+                job.func(job.items)
+        except Exception as e:
+            error = e
+            print(f"Write failed: {e}")
+        if not job.callbacks:
+            return
+        try:
+            from gi.repository import GLib
+        except ImportError:
+            GLib = None
+        for callback in job.callbacks:
+            if GLib is not None:
+                GLib.idle_add(callback, error)
+            else:
+                callback(error)
+
+    def flush(self, timeout=None):
+        """Block until every queued job has been written."""
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(
+                    lambda: not self._pending and not self._busy, timeout)
+            finally:
+                self._flushing = False
+
+    def close(self, timeout=None):
+        """Flush outstanding jobs and stop the worker thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+_writer = None
+
+
+def get_writer():
+    """Return the process-wide writer."""
+    global _writer
+    if _writer is None:
+        _writer = Writer()
+    return _writer
@@ -0,0 +1,213 @@
+"""End-of-term reports for every profile at once.
+
+    python -m kanslokartan.batch -o ~/reports/ht2026
+
+Each profile gets <name>.csv, <name>.json and <name>.pdf written by the
+export functions. The results history is streamed once and spilled into one
+temporary file per profile, so the parent never holds the whole history and
+each worker reads only its own rows; profiles are handled by a process pool
+with a bounded number of jobs in flight. Finished profiles are appended to
+a progress log in the output directory; rerunning the command skips those
+whose data has not changed since, so an interrupted batch picks up where
+it stopped.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from kanslokartan.dashboard import profile_signature
+from kanslokartan.export import export_csv, export_json, export_pdf
+
+PROGRESS_LOG = ".batch-progress.jsonl"
+FORMATS = (("csv", export_csv), ("json", export_json), ("pdf", export_pdf))
+OPEN_SPILLS = 64
+
+
+def config_dir():
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "kanslokartan")
+
+
+def profiles_dir():
+    return os.path.join(os.path.expanduser("~"), ".config", "kanslokartan", "profiles")
+
+
+def profile_names(directory):
+    try:
+        entries = sorted(os.scandir(directory), key=lambda e: e.name)
+    except OSError:
+        return []
+    names = []
+    for entry in entries:
+        if entry.name.startswith(".") or entry.name == "index.json":
+            continue
+        if entry.is_dir():
+            names.append(entry.name)
+        elif entry.name.endswith(".json"):
+            names.append(entry.name[:-5])
+    return sorted(set(names))
+
+
+def spill_rows(config, directory):
+    """Stream the results history into one JSON-lines file per profile.
+
+    Returns {profile: (path, rows)}. At most OPEN_SPILLS files are open at
+    once; the least recently written one is closed to make room.
+    """
+    from kanslokartan.storage import open_store
+    store = open_store(config)
+    spills = {}
+    handles = OrderedDict()
+    try:
+        for r in store.query_results():
+            name = r.get("profile", "default")
+            if name not in spills:
+                spills[name] = (os.path.join(directory, f"{len(spills)}.jsonl"), 0)
+            path, count = spills[name]
+            f = handles.pop(name, None)
+            if f is None:
+                if len(handles) >= OPEN_SPILLS:
+                    handles.popitem(last=False)[1].close()
+                f = open(path, "a", encoding="utf-8")
+            handles[name] = f
+            f.write(json.dumps({"date": r.get("date", ""), "details": r.get("emotion", ""),
+                                "result": str(r.get("correct"))}, ensure_ascii=False) + "\n")
+            spills[name] = (path, count + 1)
+    finally:
+        for f in handles.values():
+            f.close()
+        store.close()
+    return spills
+
+
+def _read_spill(path):
+    if path is None:
+        return []
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    rows.sort(key=lambda row: str(row["date"]))
+    return rows
+
+
+def report_profile(output, name, spill=None):
+    """Write all report files for one profile; runs in a worker process.
+
+    spill is the profile's file from spill_rows(), or None for no rows.
+    """
+    rows = _read_spill(spill)
+    size = 0
+    for ext, write in FORMATS:
+        path = os.path.join(output, f"{name}.{ext}")
+        tmp = f"{path}.part"
+        try:
+            write(rows, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        size += os.path.getsize(path)
+    return name, len(rows), size
+
+
+def _load_progress(output):
+    done = {}
+    try:
+        with open(os.path.join(output, PROGRESS_LOG), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                done[record["profile"]] = record["signature"]
+    except OSError:
+        pass
+    return done
+
+
+def run(output, config=None, profiles=None, workers=None, progress=None):
+    """Generate reports for every changed profile; returns a summary dict."""
+    config = config or config_dir()
+    profiles = profiles or profiles_dir()
+    stats = os.path.join(config, "quizstats")
+    os.makedirs(output, exist_ok=True)
+    done = _load_progress(output)
+    workers = workers or os.cpu_count() or 1
+    summary = {"profiles": 0, "skipped": 0, "failed": 0, "rows": 0, "bytes": 0}
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix=".batch-rows-", dir=output) as spill_dir:
+        results = spill_rows(config, spill_dir)
+        pending = {}
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool, \
+                open(os.path.join(output, PROGRESS_LOG), "a", encoding="utf-8") as log:
+
+            def collect(futures):
+                for future in futures:
+                    name, signature = pending.pop(future)
+                    try:
+                        _name, rows, size = future.result()
+                    except Exception as e:
+                        summary["failed"] += 1
+                        print(f"{name}: {e}", file=sys.stderr)
+                        continue
+                    summary["profiles"] += 1
+                    summary["rows"] += rows
+                    summary["bytes"] += size
+                    log.write(json.dumps({"profile": name, "signature": signature}) + "\n")
+                    log.flush()
+                    if progress:
+                        progress(name, rows)
+
+            for name in sorted(set(profile_names(profiles)) | set(results)):
+                # Imported results do not touch the quiz stats file, so the
+                # row count is part of the signature too.
+                spill, count = results.get(name, (None, 0))
+                signature = profile_signature(profiles, stats, name) + [count]
+                if done.get(name) == signature and all(
+                        os.path.exists(os.path.join(output, f"{name}.{ext}"))
+                        for ext, _w in FORMATS):
+                    summary["skipped"] += 1
+                    continue
+                if len(pending) >= workers * 2:
+                    finished, _rest = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                pending[pool.submit(report_profile, output, name, spill)] = (name, signature)
+            collect(wait(pending)[0])
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kanslokartan.batch",
+                                     description="write CSV, JSON and PDF reports per profile")
+    parser.add_argument("-o", "--output", required=True, help="report directory")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--config-dir", default=config_dir())
+    parser.add_argument("--profiles-dir", default=profiles_dir())
+    args = parser.parse_args(argv)
+    try:
+        summary = run(args.output, args.config_dir, args.profiles_dir, args.jobs,
+                      progress=lambda name, rows: print(f"{name}: {rows} rows", file=sys.stderr))
+    except OSError as e:
+        print(f"kanslokartan.batch: {e}", file=sys.stderr)
+        return 1
+    seconds = summary["seconds"] or 1e-9
+    print(f"{summary['profiles']} profiles written, {summary['skipped']} unchanged, "
+          f"{summary['failed']} failed; {summary['rows']} rows, "
+          f"{summary['bytes'] / 1e6:.1f} MB in {summary['seconds']:.2f} s "
+          f"({summary['profiles'] / seconds:.1f} profiles/s, "
+          f"{summary['rows'] / seconds:.0f} rows/s)", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
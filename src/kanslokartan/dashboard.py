@@ -0,0 +1,314 @@
+"""Classroom overview across every profile on the machine.
+
+Each profile is reduced to a small summary (quiz answers, accuracy and
+answer time per emotion, and recent answers per day for trends). Summaries
+are cached in one JSON file keyed by the modification time of the file they
+were built from, so only profiles that changed since the last visit are
+parsed again. Nothing here imports GTK.
+
+Parsing one profile takes well under a millisecond, while starting a spawn
+pool takes a large fraction of a second and shipping each summary back
+costs about as much as parsing it, so stale profiles are parsed in this
+process unless there are at least POOL_THRESHOLD of them and more than one
+core (measured with ``--benchmark``). The app runs the pool in a helper process
+(``python -m kanslokartan.dashboard``): spawned workers re-run the
+parent's __main__ script, which for the GUI would be the app launcher.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from kanslokartan.writer import write_json_atomic
+
+VERSION = 3
+# Below this many stale profiles, parsing in-process beats the pool's start-up
+# cost; see benchmark(). 300 profiles parse in 0.1 s sequentially.
+POOL_THRESHOLD = 2000
+TREND_DAYS = 7
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def profile_signature(profiles_dir, stats_dir, name):
+    """Return the mtimes a profile summary depends on.
+
+    The quiz stats file is rewritten after every answer the profile gives.
+    """
+    return [_mtime(os.path.join(stats_dir, f"{name}.json"))]
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def summarize(profiles_dir, stats_dir, name):
+    """Build the summary for one profile; runs in a worker process."""
+    answered = {}
+    correct = {}
+    latency = [0.0, 0]
+    stats = _read_json(os.path.join(stats_dir, f"{name}.json")) or {}
+    for shown, row in stats.get("matrix", {}).items():
+        answered[shown] = sum(row.values())
+        correct[shown] = row.get(shown, 0)
+    for total, count in stats.get("latency", {}).values():
+        latency[0] += total
+        latency[1] += count
+    return {"answered": answered, "correct": correct, "latency": latency,
+            "days": stats.get("days", {})}
+
+
+def _summarize_args(args):
+    return summarize(*args)
+
+
+def _want_pool(stale):
+    return stale >= POOL_THRESHOLD and (os.cpu_count() or 1) > 1
+
+
+class Dashboard:
+    """Cached per-profile summaries and the class totals built from them."""
+
+    def __init__(self, profiles_dir, stats_dir, cache_path):
+        self.profiles_dir = profiles_dir
+        self.stats_dir = stats_dir
+        self.cache_path = cache_path
+        self.summaries = {}
+        self.parsed = 0
+        self._cache = self._load_cache()
+
+    def _load_cache(self):
+        cache = _read_json(self.cache_path) or {}
+        return cache.get("profiles", {}) if cache.get("version") == VERSION else {}
+
+    def _names(self):
+        names = set()
+        for directory in (self.profiles_dir, self.stats_dir):
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith(".") or entry.name == "index.json":
+                    continue
+                if entry.is_dir():
+                    names.add(entry.name)
+                elif entry.name.endswith(".json"):
+                    names.add(entry.name[:-5])
+        return sorted(names)
+
+    def _scan(self):
+        """Return the current signatures and the names whose cache is stale."""
+        signatures = {}
+        stale = []
+        for name in self._names():
+            signature = profile_signature(self.profiles_dir, self.stats_dir, name)
+            signatures[name] = signature
+            cached = self._cache.get(name)
+            if cached is None or cached["signature"] != signature:
+                stale.append(name)
+        return signatures, stale
+
+    def refresh(self, workers=None, pool=None):
+        """Load every profile summary, parsing only those that changed.
+
+        pool forces (True) or rules out (False) the process pool; by default
+        it is used from POOL_THRESHOLD stale profiles up.
+        """
+        signatures, stale = self._scan()
+        jobs = [(self.profiles_dir, self.stats_dir, name) for name in stale]
+        if pool is None:
+            pool = _want_pool(len(jobs))
+        if pool and jobs:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                fresh = list(pool.map(_summarize_args, jobs, chunksize=8))
+        else:
+            fresh = [_summarize_args(job) for job in jobs]
+        for name, summary in zip(stale, fresh):
+            self._cache[name] = {"signature": signatures[name], "summary": summary}
+
+        removed = set(self._cache) - set(signatures)
+        for name in removed:
+            del self._cache[name]
+        self.parsed = len(stale)
+        self.summaries = {name: self._cache[name]["summary"] for name in signatures}
+        if stale or removed:
+            write_json_atomic(self.cache_path, {"version": VERSION, "profiles": self._cache},
+                              indent=None)
+        return self.summaries
+
+    def refresh_isolated(self, pool=None):
+        """Like refresh(), but any process pool runs in a helper process.
+
+        For callers whose __main__ must not be re-run by spawned workers,
+        such as the GUI. The helper writes the cache, which is then read.
+        """
+        _signatures, stale = self._scan()
+        if pool is None:
+            pool = _want_pool(len(stale))
+        if pool and stale:
+            package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            env = dict(os.environ)
+            env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root,
+                                                              env.get("PYTHONPATH")]))
+            subprocess.run([sys.executable, "-m", "kanslokartan.dashboard",
+                            "--profiles-dir", self.profiles_dir, "--stats-dir", self.stats_dir,
+                            "--cache", self.cache_path, "--pool"], env=env, check=False)
+            self._cache = self._load_cache()
+        return self.refresh(pool=False)
+
+    def totals(self):
+        """Return class-wide answers and accuracy inputs."""
+        answered = {}
+        correct = {}
+        latency = [0.0, 0]
+        days = {}
+        for summary in self.summaries.values():
+            for target, source in ((answered, summary["answered"]),
+                                   (correct, summary["correct"])):
+                for key, count in source.items():
+                    target[key] = target.get(key, 0) + count
+            latency[0] += summary["latency"][0]
+            latency[1] += summary["latency"][1]
+            for day, emotions in summary["days"].items():
+                merged = days.setdefault(day, {})
+                for key, (n, right) in emotions.items():
+                    counts = merged.setdefault(key, [0, 0])
+                    counts[0] += n
+                    counts[1] += right
+        return {"profiles": len(self.summaries), "answered": answered, "correct": correct,
+                "latency": latency, "days": days}
+
+
+def accuracy(summary, emotion=None):
+    """Return the share of correct answers, overall or for one emotion id."""
+    if emotion is None:
+        total = sum(summary["answered"].values())
+        right = sum(summary["correct"].values())
+    else:
+        total = summary["answered"].get(str(emotion), 0)
+        right = summary["correct"].get(str(emotion), 0)
+    return right / total if total else None
+
+
+def _window(summary, emotion, first, last):
+    total = right = 0
+    for day, emotions in summary["days"].items():
+        if first <= day <= last:
+            counts = emotions.values() if emotion is None else [emotions.get(str(emotion),
+                                                                              (0, 0))]
+            for n, r in counts:
+                total += n
+                right += r
+    return total, right
+
+
+def trend(summary, emotion=None, today=None):
+    """Return the change in accuracy over the last TREND_DAYS days.
+
+    Compares the last TREND_DAYS days with the TREND_DAYS before them,
+    overall or for one emotion id; None if either window has no answers.
+    """
+    today = today or date.today()
+    edges = [(today - timedelta(days=n)).isoformat()
+             for n in (0, TREND_DAYS - 1, TREND_DAYS, 2 * TREND_DAYS - 1)]
+    recent, right = _window(summary, emotion, edges[1], edges[0])
+    before, before_right = _window(summary, emotion, edges[3], edges[2])
+    if not recent or not before:
+        return None
+    return right / recent - before_right / before
+
+
+def _write_profiles(root, profiles, answers, rng):
+    ids = [str(i) for i in range(10)]
+    today = date.today()
+    profiles_dir = os.path.join(root, "profiles")
+    stats_dir = os.path.join(root, "quizstats")
+    os.makedirs(stats_dir)
+    for n in range(profiles):
+        name = f"child{n:04d}"
+        os.makedirs(os.path.join(profiles_dir, name))
+        matrix = {}
+        days = {}
+        for _ in range(answers):
+            shown = rng.choice(ids)
+            chosen = rng.choice(ids)
+            row = matrix.setdefault(shown, {})
+            row[chosen] = row.get(chosen, 0) + 1
+            day = (today - timedelta(days=rng.randrange(28))).isoformat()
+            counts = days.setdefault(day, {}).setdefault(shown, [0, 0])
+            counts[0] += 1
+            counts[1] += shown == chosen
+        write_json_atomic(os.path.join(stats_dir, f"{name}.json"),
+                          {"version": 2, "matrix": matrix, "latency": {}, "days": days})
+    return profiles_dir, stats_dir
+
+
+def benchmark(sizes=(30, 300, 3000), answers=400):
+    """Time a cold load in-process and through the helper pool, then a warm load.
+
+    Generated profiles live in a temp dir. The pool column includes the
+    helper process and worker start-up the GUI would pay for.
+    """
+    import random
+    import tempfile
+
+    rng = random.Random(0)
+    print(f"{os.cpu_count()} cores")
+    print("profiles  sequential  pool      warm")
+    for profiles in sizes:
+        with tempfile.TemporaryDirectory() as root:
+            profiles_dir, stats_dir = _write_profiles(root, profiles, answers, rng)
+            timings = []
+            for label, pool in (("sequential", False), ("pool", True), ("warm", False)):
+                cache = os.path.join(root, f"{label}.json")
+                if label == "warm":
+                    cache = os.path.join(root, "sequential.json")
+                start = time.perf_counter()
+                board = Dashboard(profiles_dir, stats_dir, cache)
+                board.refresh_isolated(pool=pool)
+                board.totals()
+                timings.append(time.perf_counter() - start)
+            print(f"{profiles:8d}  " + "  ".join(f"{t:8.3f}s" for t in timings))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kanslokartan.dashboard",
+                                     description="refresh the class overview cache")
+    parser.add_argument("--profiles-dir")
+    parser.add_argument("--stats-dir")
+    parser.add_argument("--cache")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--pool", action="store_true",
+                        help="parse in a process pool however few profiles changed")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time a cold and a warm load over generated profiles")
+    args = parser.parse_args(argv)
+    if args.benchmark:
+        benchmark()
+        return 0
+    if not (args.profiles_dir and args.stats_dir and args.cache):
+        parser.error("--profiles-dir, --stats-dir and --cache are required")
+    Dashboard(args.profiles_dir, args.stats_dir, args.cache).refresh(args.jobs,
+                                                                       args.pool or None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
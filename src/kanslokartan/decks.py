@@ -0,0 +1,106 @@
+"""Photo decks for the emotion quiz.
+
+A deck is a folder of images plus a deck.json manifest:
+
+    {"name": "Faces", "cards": [{"file": "happy-01.jpg", "emotion": 28530}, ...]}
+
+where emotion is an id from EMOTIONS. Images are decoded on worker threads
+into a bounded LRU cache of Gdk.Textures, so showing a card never blocks
+the UI on disk or decoding.
+"""
+
+import json
+import os
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import gi
+gi.require_version('Gdk', '4.0')
+gi.require_version('GdkPixbuf', '2.0')
+from gi.repository import Gdk, GdkPixbuf, GLib
+
+MAX_SIZE = 640
+
+
+class Deck:
+    """Image files grouped by emotion id."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "deck.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.name = manifest.get("name") or os.path.basename(directory)
+        self.cards = {}
+        for card in manifest.get("cards", []):
+            path = os.path.join(directory, card["file"])
+            self.cards.setdefault(int(card["emotion"]), []).append(path)
+
+    def emotion_ids(self):
+        return set(self.cards)
+
+    def pick(self, emotion_id, rng=random):
+        """Return a random image path for emotion_id, or None."""
+        paths = self.cards.get(emotion_id)
+        return rng.choice(paths) if paths else None
+
+
+def _decode(path):
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, MAX_SIZE, MAX_SIZE, True)
+    return Gdk.Texture.new_for_pixbuf(pixbuf)
+
+
+class TextureCache:
+    """LRU cache of decoded textures filled by background decoders.
+
+    All public methods must be called from the GTK main thread; decoded
+    textures are handed back to it with GLib.idle_add.
+    """
+
+    def __init__(self, capacity=32, workers=2):
+        self._capacity = capacity
+        self._textures = OrderedDict()
+        self._waiting = {}
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="kanslokartan-decode")
+
+    def get(self, path):
+        texture = self._textures.get(path)
+        if texture is not None:
+            self._textures.move_to_end(path)
+        return texture
+
+    def request(self, path, callback=None):
+        """Call callback(texture) once path is decoded (None on failure)."""
+        texture = self.get(path)
+        if texture is not None:
+            if callback:
+                callback(texture)
+            return
+        callbacks = self._waiting.get(path)
+        if callbacks is not None:
+            if callback:
+                callbacks.append(callback)
+            return
+        self._waiting[path] = [callback] if callback else []
+        future = self._pool.submit(_decode, path)
+        future.add_done_callback(lambda f: GLib.idle_add(self._finish, path, f))
+
+    def prefetch(self, path):
+        self.request(path)
+
+    def _finish(self, path, future):
+        try:
+            texture = future.result()
+        except GLib.Error as e:
+            print(f"Deck image {path}: {e.message}")
+            texture = None
+        if texture is not None:
+            self._textures[path] = texture
+            while len(self._textures) > self._capacity:
+                self._textures.popitem(last=False)
+        for callback in self._waiting.pop(path, []):
+            callback(texture)
+        return False
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
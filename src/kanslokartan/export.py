@@ -41,10 +41,6 @@ def export_json(data, filepath):
 
 
 def export_pdf(data, filepath):
-    """Export data to simple text-PDF with branding footer."""
-    lines = [f"{APP_LABEL} — {_('Export')}", ""]
-    for entry in data:
-        lines.append(f"{entry.get('date', '')} | {entry.get('details', '')} | {entry.get('result', '')}")
-    lines.extend(["", _footer()])
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    """Export data to a paginated A4 PDF with branding footer."""
+    from kanslokartan.report import write_pdf
+    write_pdf(data, f"{APP_LABEL} — {_('Export')}", filepath)
@@ -1,17 +1,19 @@
 """Känslokartan - Emotion recognition training."""
 import sys
 import os
-import json
 import random
+import time
 import gettext
 import locale
+from kanslokartan import startup
+startup.mark("interpreter")
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, Gio, GLib, Gdk
+startup.mark("import gtk")
 from kanslokartan import __version__
-from kanslokartan.accessibility import apply_large_text
-from kanslokartan.accessibility import AccessibilityManager
+from kanslokartan.writer import get_writer, write_json_atomic
 
 TEXTDOMAIN = "kanslokartan"
 for p in [os.path.join(os.path.dirname(__file__), "locale"), "/usr/share/locale"]:
@@ -36,21 +38,42 @@ EMOTIONS = [
 ]
 
 CONFIG_DIR = os.path.join(GLib.get_user_config_dir(), "kanslokartan")
-RESULTS_FILE = os.path.join(CONFIG_DIR, "results.json")
+startup.mark("import app")
+
+_store = None
+
+
+def _get_store():
+    global _store
+    if _store is None:
+        from kanslokartan.storage import open_store
+        _store = open_store(CONFIG_DIR)
+    return _store
 
 
 def _load_results():
-    try:
-        with open(RESULTS_FILE) as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    return _get_store().load_results()
+
+
+def _append_result(result, on_done=None):
+    get_writer().append("results", _get_store().extend_results, result, on_done=on_done)
+
+
+def _quiz_stats_path(profile):
+    return os.path.join(CONFIG_DIR, "quizstats", f"{profile}.json")
 
 
-def _save_results(results):
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(RESULTS_FILE, "w") as f:
-        json.dump(results[-500:], f, ensure_ascii=False, indent=2)
+def _load_quiz_stats(profile):
+    """Load a profile's summary; a missing one is rebuilt from its own answers.
+
+    Results saved before answers were tagged with a profile count as the
+    default profile's. The generator is only read if a rebuild is needed.
+    """
+    from kanslokartan.quizstats import QuizStats
+    ids = {e["name"]: e["id"] for e in EMOTIONS}
+    results = (r for r in _get_store().query_results()
+               if r.get("profile", "default") == profile)
+    return QuizStats.load(_quiz_stats_path(profile), results, ids)
 
 
 
@@ -68,10 +91,9 @@ def _load_settings():
             return json.load(f)
     return {}
 
-def _save_settings(s):
-    import json
-    with open(_settings_path(), "w") as f:
-        json.dump(s, f, indent=2)
+def _save_settings(s, on_done=None):
+    get_writer().submit("settings", write_json_atomic, _settings_path(), dict(s),
+                        on_done=on_done)
 
 class KansloApp(Adw.Application):
     def __init__(self):
@@ -79,13 +101,24 @@ class KansloApp(Adw.Application):
                          flags=Gio.ApplicationFlags.DEFAULT_FLAGS)
 
     def do_activate(self):
+        startup.mark("activate")
+        from kanslokartan.accessibility import apply_large_text
         apply_large_text()
-        win = self.props.active_window or KansloWindow(application=self)
+        startup.mark("accessibility")
+        win = self.props.active_window
+        if win is None:
+            win = KansloWindow(application=self)
+            startup.watch_window(win)
         win.present()
+        GLib.idle_add(_preload_sounds, priority=GLib.PRIORITY_LOW)
         if not self.settings.get("welcome_shown"):
             self._show_welcome(win)
 
 
+    def do_shutdown(self):
+        get_writer().close()
+        Adw.Application.do_shutdown(self)
+
     def do_startup(self):
         Adw.Application.do_startup(self)
         for name, cb, accel in [
@@ -93,6 +126,9 @@ class KansloApp(Adw.Application):
             ("about", self._on_about, None),
             ("shortcuts", self._on_shortcuts, "<Control>slash"),
             ("export", self._on_export, "<Control>e"),
+            ("progress", self._on_progress, None),
+            ("deck", self._on_deck, None),
+            ("dashboard", self._on_dashboard, None),
         ]:
             a = Gio.SimpleAction.new(name, None)
             a.connect("activate", cb)
@@ -118,6 +154,21 @@ class KansloApp(Adw.Application):
         if w:
             w.do_export()
 
+    def _on_progress(self, *_args):
+        w = self.props.active_window
+        if w:
+            w.show_progress()
+
+    def _on_deck(self, *_args):
+        w = self.props.active_window
+        if w:
+            w.choose_deck()
+
+    def _on_dashboard(self, *_args):
+        w = self.props.active_window
+        if w:
+            w.show_dashboard()
+
 
 class KansloWindow(Adw.ApplicationWindow):
     def __init__(self, **kwargs):
@@ -127,8 +178,19 @@ class KansloWindow(Adw.ApplicationWindow):
         self.total = 0
         self.current = None
         self.results = _load_results()
+        from kanslokartan.profiles import ProfileManager
+        self.profiles = ProfileManager("kanslokartan")
+        self.quiz_stats = _load_quiz_stats(self.profiles.current)
+        self.deck = None
+        self.textures = None
+        self._upcoming = None
+        self._load_deck(_load_settings().get("deck"))
+        self._shown_at = None
+        self._save_error = None
+        startup.mark("load results")
         self._build_ui()
         self._next_emotion()
+        startup.mark("build window")
 
     def _build_ui(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
@@ -137,6 +199,9 @@ class KansloWindow(Adw.ApplicationWindow):
         box.append(header)
 
         menu = Gio.Menu()
+        menu.append(_("Progress"), "app.progress")
+        menu.append(_("Class Overview"), "app.dashboard")
+        menu.append(_("Use Photo Deck…"), "app.deck")
         menu.append(_("Export Results"), "app.export")
         menu.append(_("Keyboard Shortcuts"), "app.shortcuts")
         menu.append(_("About Emotion Map"), "app.about")
@@ -159,6 +224,13 @@ class KansloWindow(Adw.ApplicationWindow):
         self.emoji_label.set_margin_bottom(20)
         box.append(self.emoji_label)
 
+        self.picture = Gtk.Picture(content_fit=Gtk.ContentFit.CONTAIN, can_shrink=True)
+        self.picture.set_size_request(280, 280)
+        self.picture.set_margin_top(20)
+        self.picture.set_margin_bottom(20)
+        self.picture.set_visible(False)
+        box.append(self.picture)
+
         self.prompt_label = Gtk.Label(label=_("What emotion is this?"))
         self.prompt_label.add_css_class("title-2")
         self.prompt_label.set_margin_bottom(16)
@@ -170,6 +242,9 @@ class KansloWindow(Adw.ApplicationWindow):
         self.btn_grid.set_margin_start(24)
         self.btn_grid.set_margin_end(24)
         box.append(self.btn_grid)
+        from kanslokartan.pool import WidgetPool
+        self.answer_pool = WidgetPool(self._create_answer_button, self._bind_answer_button,
+                                      self._hide_answer_button)
 
         self.feedback_label = Gtk.Label(label="")
         self.feedback_label.add_css_class("title-3")
@@ -194,25 +269,102 @@ class KansloWindow(Adw.ApplicationWindow):
         GLib.timeout_add_seconds(1, self._update_clock)
         self._update_clock()
 
+    def _load_deck(self, directory):
+        """Switch to the photo deck in directory (None for emoji only)."""
+        from kanslokartan.scheduler import Scheduler
+        items = EMOTIONS
+        self.deck = None
+        self._upcoming = None
+        if directory:
+            from kanslokartan.decks import Deck, TextureCache
+            try:
+                deck = Deck(directory)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Deck {directory}: {e}")
+                deck = None
+            deck_items = [e for e in EMOTIONS if deck and e["id"] in deck.emotion_ids()]
+            if len(deck_items) >= 2:
+                self.deck, items = deck, deck_items
+                if self.textures is None:
+                    self.textures = TextureCache()
+        self.scheduler = Scheduler(items, self.quiz_stats)
+        return self.deck is not None
+
+    def choose_deck(self):
+        fd = Gtk.FileDialog.new()
+        fd.set_title(_("Choose Photo Deck"))
+        fd.select_folder(self, None, self._on_deck_chosen)
+
+    def _on_deck_chosen(self, dialog, result):
+        try:
+            folder = dialog.select_folder_finish(result)
+        except GLib.Error:
+            return
+        path = folder.get_path()
+        if not self._load_deck(path):
+            self.feedback_label.set_label(_("No usable deck.json in %s") % path)
+            return
+        settings = _load_settings()
+        settings["deck"] = path
+        _save_settings(settings, self._on_saved)
+        self._next_emotion()
+
+    def _show_card(self, image):
+        """Show the current emotion as a photo if one is given, else as emoji."""
+        current = self.current
+        texture = self.textures.get(image) if image else None
+        if image and texture is None:
+            self.textures.request(image, lambda t: self._on_texture(current, t))
+        self._set_card(texture, image is not None)
+
+    def _on_texture(self, shown, texture):
+        if shown is self.current:
+            self._set_card(texture, texture is not None)
+
+    def _set_card(self, texture, photo):
+        self.picture.set_paintable(texture)
+        self.picture.set_visible(photo)
+        self.emoji_label.set_visible(not photo)
+        if not photo:
+            self.emoji_label.set_markup(f'<span size="120000">{self.current["emoji"]}</span>')
+
     def _next_emotion(self):
-        self.current = random.choice(EMOTIONS)
-        self.emoji_label.set_markup(f'<span size="120000">{self.current["emoji"]}</span>')
+        if self._upcoming is not None:
+            self.current, image = self._upcoming
+        else:
+            self.current = self.scheduler.next()
+            image = self.deck.pick(self.current["id"]) if self.deck else None
+        self._show_card(image)
+        if self.deck:
+            # Decode next round's photo while this one is being answered.
+            upcoming = self.scheduler.next()
+            self._upcoming = (upcoming, self.deck.pick(upcoming["id"]))
+            if self._upcoming[1]:
+                self.textures.prefetch(self._upcoming[1])
         self.feedback_label.set_label("")
         self.next_btn.set_visible(False)
 
-        wrong = [e for e in EMOTIONS if e["id"] != self.current["id"]]
-        choices = random.sample(wrong, min(3, len(wrong))) + [self.current]
+        choices = self.scheduler.distractors(self.current, 3) + [self.current]
         random.shuffle(choices)
 
-        while (child := self.btn_grid.get_first_child()):
-            self.btn_grid.remove(child)
+        self.answer_pool.rebind(choices)
+        self._shown_at = time.monotonic()
 
-        for em in choices:
-            btn = Gtk.Button(label=em["name"])
-            btn.add_css_class("pill")
-            btn.set_size_request(180, 48)
-            btn.connect("clicked", self._on_answer, em)
-            self.btn_grid.append(btn)
+    def _create_answer_button(self):
+        btn = Gtk.Button()
+        btn.add_css_class("pill")
+        btn.set_size_request(180, 48)
+        btn.connect("clicked", lambda b: self._on_answer(b, self.answer_pool.data(b)))
+        self.btn_grid.append(btn)
+        return btn
+
+    def _bind_answer_button(self, btn, em):
+        btn.set_label(em["name"])
+        btn.set_sensitive(True)
+        btn.get_parent().set_visible(True)
+
+    def _hide_answer_button(self, btn):
+        btn.get_parent().set_visible(False)
 
     def _on_answer(self, btn, chosen):
         self.total += 1
@@ -220,23 +372,134 @@ class KansloWindow(Adw.ApplicationWindow):
         if correct:
             self.score += 1
             self.feedback_label.set_label(_("Correct! \u2705"))
+            _play_sound("complete")
         else:
             self.feedback_label.set_label(_("Not quite. It was: %s") % self.current["name"])
+            _play_sound("bell")
 
         self.score_label.set_label(_("Score: %d / %d") % (self.score, self.total))
 
-        child = self.btn_grid.get_first_child()
-        while child:
-            inner = child.get_first_child()
-            if inner:
-                inner.set_sensitive(False)
-            child = child.get_next_sibling()
+        for answer_btn in self.answer_pool.active:
+            answer_btn.set_sensitive(False)
         self.next_btn.set_visible(True)
 
+        latency = round(time.monotonic() - self._shown_at, 3)
         from datetime import datetime
-        self.results.append({"date": datetime.now().isoformat(), "emotion": self.current["name"],
-                              "chosen": chosen["name"], "correct": correct})
-        _save_results(self.results)
+        result = {"date": datetime.now().isoformat(), "emotion": self.current["name"],
+                  "chosen": chosen["name"], "correct": correct,
+                  "emotion_id": self.current["id"], "chosen_id": chosen["id"],
+                  "latency": latency, "profile": self.profiles.current}
+        self.results.append(result)
+        _append_result(result, self._on_saved)
+        self.quiz_stats.record(self.current["id"], chosen["id"], latency, result["date"][:10])
+        self.scheduler.record(self.current, chosen)
+        get_writer().submit(("quizstats", self.profiles.current), self.quiz_stats.save,
+                            on_done=self._on_saved)
+        self.profiles.set_summary(dict(self.quiz_stats.summary(), last_answer=result["date"]))
+
+    def show_progress(self):
+        """Show per-emotion accuracy, answer time and common mix-ups."""
+        names = {e["id"]: e["name"] for e in EMOTIONS}
+        listbox = Gtk.ListBox(selection_mode=Gtk.SelectionMode.NONE)
+        listbox.add_css_class("boxed-list")
+        for em in EMOTIONS:
+            accuracy = self.quiz_stats.accuracy(em["id"])
+            if accuracy is None:
+                subtitle = _("Not practised yet")
+            else:
+                subtitle = _("%d%% correct of %d") % (round(accuracy * 100),
+                                                      self.quiz_stats.answered(em["id"]))
+                latency = self.quiz_stats.mean_latency(em["id"])
+                if latency is not None:
+                    subtitle += " · " + _("%.1f s") % latency
+                mixed = [names[c] for c, _n in self.quiz_stats.confusions(em["id"], 2) if c in names]
+                if mixed:
+                    subtitle += " · " + _("Mixed up with: %s") % ", ".join(mixed)
+            listbox.append(Adw.ActionRow(title=f'{em["emoji"]} {em["name"]}', subtitle=subtitle))
+
+        scroll = Gtk.ScrolledWindow(vexpand=True, child=listbox)
+        listbox.set_margin_start(12)
+        listbox.set_margin_end(12)
+        listbox.set_margin_top(12)
+        listbox.set_margin_bottom(12)
+        view = Adw.ToolbarView(content=scroll)
+        view.add_top_bar(Adw.HeaderBar())
+        dialog = Adw.Dialog(title=_("Progress"), content_width=420, content_height=520, child=view)
+        dialog.present(self)
+
+    def show_dashboard(self):
+        """Show quiz accuracy across all profiles."""
+        import threading
+        from kanslokartan.dashboard import Dashboard
+        board = Dashboard(self.profiles.directory, os.path.join(CONFIG_DIR, "quizstats"),
+                          os.path.join(CONFIG_DIR, "dashboard.json"))
+        listbox = Gtk.ListBox(selection_mode=Gtk.SelectionMode.NONE)
+        listbox.add_css_class("boxed-list")
+        listbox.set_margin_start(12)
+        listbox.set_margin_end(12)
+        listbox.set_margin_top(12)
+        listbox.set_margin_bottom(12)
+        listbox.append(Adw.ActionRow(title=_("Loading…")))
+        view = Adw.ToolbarView(content=Gtk.ScrolledWindow(vexpand=True, child=listbox))
+        view.add_top_bar(Adw.HeaderBar())
+        dialog = Adw.Dialog(title=_("Class Overview"), content_width=480, content_height=600,
+                            child=view)
+        dialog.present(self)
+
+        def load():
+            try:
+                board.refresh_isolated()
+            except Exception as e:
+                print(f"Dashboard failed: {e}")
+            GLib.idle_add(self._fill_dashboard, listbox, board)
+
+        threading.Thread(target=load, name="kanslokartan-dashboard", daemon=True).start()
+
+    def _fill_dashboard(self, listbox, board):
+        from kanslokartan.dashboard import accuracy, trend
+        listbox.remove_all()
+        names = {str(e["id"]): e for e in EMOTIONS}
+        totals = board.totals()
+        if not board.summaries:
+            listbox.append(Adw.ActionRow(title=_("No profiles yet")))
+            return False
+
+        def label(key):
+            em = names.get(str(key))
+            return f'{em["emoji"]} {em["name"]}' if em else str(key)
+
+        def change(summary, emotion=None):
+            delta = trend(summary, emotion)
+            if delta is None:
+                return None
+            return _("%+d points this week") % round(delta * 100)
+
+        class_row = Adw.ExpanderRow(title=_("Whole class"),
+                                    subtitle=_("%d profiles") % totals["profiles"])
+        for em in EMOTIONS:
+            acc = accuracy(totals, em["id"])
+            if acc is not None:
+                parts = [_("%d%% correct of %d") % (round(acc * 100),
+                                                    totals["answered"][str(em["id"])])]
+                parts.append(change(totals, em["id"]))
+                class_row.add_row(Adw.ActionRow(title=label(em["id"]),
+                                                subtitle=" · ".join(filter(None, parts))))
+        listbox.append(class_row)
+
+        for name, summary in sorted(board.summaries.items()):
+            parts = []
+            acc = accuracy(summary)
+            if acc is not None:
+                parts.append(_("%d%% correct of %d") % (round(acc * 100),
+                                                        sum(summary["answered"].values())))
+            parts.append(change(summary))
+            last = self.profiles.info(name).get("summary", {}).get("last_answer")
+            if last:
+                parts.append(_("last practised %s") % last[:10])
+            listbox.append(Adw.ActionRow(title=name,
+                                         subtitle=" · ".join(filter(None, parts))
+                                         or _("No activity yet")))
+        return False
 
     def do_export(self):
         from kanslokartan.export import export_csv, export_json
@@ -254,9 +517,17 @@ class KansloWindow(Adw.ApplicationWindow):
             Adw.ColorScheme.FORCE_LIGHT if mgr.get_dark() else Adw.ColorScheme.FORCE_DARK)
 
     def _update_clock(self):
-        self.status_label.set_label(GLib.DateTime.new_now_local().format("%Y-%m-%d %H:%M:%S"))
+        self.status_label.set_label(self._save_error or
+                                    GLib.DateTime.new_now_local().format("%Y-%m-%d %H:%M:%S"))
         return True
 
+    def _on_saved(self, error):
+        """Writer callback; keeps a failed save in the status bar until one succeeds."""
+        message = _("Could not save: %s") % error if error else None
+        if message != self._save_error:
+            self._save_error = message
+            self._update_clock()
+
 
 def main():
     app = KansloApp()
@@ -297,16 +568,17 @@ if __name__ == "__main__":
 
     def _on_welcome_close(self, btn, dialog):
         self.settings["welcome_shown"] = True
-        _save_settings(self.settings)
+        win = self.props.active_window
+        _save_settings(self.settings, win._on_saved if win else None)
         dialog.close()
 
 
 
 # --- Session restore ---
-import json as _json
 import os as _os
 
 def _save_session(window, app_name):
+    import json as _json
     config_dir = _os.path.join(_os.path.expanduser('~'), '.config', app_name)
     _os.makedirs(config_dir, exist_ok=True)
     state = {'width': window.get_width(), 'height': window.get_height(),
@@ -318,6 +590,7 @@ def _save_session(window, app_name):
         pass
 
 def _restore_session(window, app_name):
+    import json as _json
     path = _os.path.join(_os.path.expanduser('~'), '.config', app_name, 'session.json')
     try:
         with open(path) as f:
@@ -343,11 +616,11 @@ def _setup_fullscreen(window, app):
 
 
 # --- Plugin system ---
-import importlib.util
 import os as _pos
 
 def _load_plugins(app_name):
     """Load plugins from ~/.config/<app>/plugins/."""
+    import importlib.util
     plugin_dir = _pos.path.join(_pos.path.expanduser('~'), '.config', app_name, 'plugins')
     plugins = []
     if not _pos.path.isdir(plugin_dir):
@@ -366,8 +639,24 @@ def _load_plugins(app_name):
 
 
 # --- Sound notifications ---
+_sound_service = None
+
+def _preload_sounds():
+    """Decode the feedback cues once so they play without a subprocess.
+
+    Runs from an idle callback after the window is shown; a cue played
+    before then falls back to a player process.
+    """
+    global _sound_service
+    if _sound_service is None:
+        from kanslokartan.sound import SoundService
+        _sound_service = SoundService()
+    return False
+
 def _play_sound(sound_name='complete'):
     """Play a system notification sound."""
+    if _sound_service is not None and _sound_service.play(sound_name):
+        return
     try:
         import subprocess
         # Try canberra-gtk-play first, then paplay
@@ -0,0 +1,76 @@
+"""Reusable widget pool.
+
+Widgets are created and wired up once, then rebound to new data every
+round instead of being destroyed and rebuilt with fresh signal handlers.
+"""
+
+
+class WidgetPool:
+    """Keeps a set of widgets bound to the current round's data."""
+
+    def __init__(self, create, bind, hide=None):
+        self._create = create
+        self._bind = bind
+        self._hide = hide
+        self._widgets = []
+        self._data = {}
+        self.active = []
+
+    def rebind(self, items):
+        """Bind items to widgets in order, creating only missing ones."""
+        while len(self._widgets) < len(items):
+            self._widgets.append(self._create())
+        self.active = self._widgets[:len(items)]
+        self._data.clear()
+        for widget, item in zip(self.active, items):
+            self._data[widget] = item
+            self._bind(widget, item)
+        if self._hide is not None:
+            for widget in self._widgets[len(items):]:
+                self._hide(widget)
+        return self.active
+
+    def data(self, widget):
+        """Return the item currently bound to widget."""
+        return self._data.get(widget)
+
+    def __len__(self):
+        return len(self._widgets)
+
+
+def benchmark(rounds=10000):
+    """Show that memory per round stays flat; runs without a display."""
+    import gc
+    import random
+    import tracemalloc
+
+    class FakeButton:
+        def __init__(self):
+            self.label = ""
+            self.sensitive = True
+            self.handlers = [lambda: None]
+
+    def bind(button, item):
+        button.label = item["name"]
+        button.sensitive = True
+
+    items = [{"id": i, "name": f"emotion {i}"} for i in range(12)]
+    pool = WidgetPool(FakeButton, bind)
+    rng = random.Random(0)
+    tracemalloc.start()
+    samples = {}
+    for n in range(1, rounds + 1):
+        pool.rebind(rng.sample(items, 4))
+        if n in (100, rounds):
+            gc.collect()
+            samples[n] = (tracemalloc.get_traced_memory()[0], len(gc.get_objects()))
+    tracemalloc.stop()
+    (mem0, obj0), (mem1, obj1) = samples[100], samples[rounds]
+    print(f"{rounds} rounds, {len(pool)} widgets created")
+    print(f"traced memory after 100 rounds: {mem0} B, after {rounds}: {mem1} B "
+          f"({(mem1 - mem0) / (rounds - 100):.3f} B/round)")
+    print(f"live objects after 100 rounds: {obj0}, after {rounds}: {obj1}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -2,20 +2,97 @@
 # --- User profiles ---
 import json as _pjson
 import os as _pos2
+import shutil as _pshutil
+import threading as _pthreading
+import time as _ptime
+
+from kanslokartan.writer import get_writer, write_atomic, write_json_atomic
+
+INDEX_VERSION = 1
+
+
+def _remove_file(path):
+    try:
+        _pos2.remove(path)
+    except FileNotFoundError:
+        pass
+
 
 class ProfileManager:
-    """Simple user profile management for barn-appar."""
+    """User profile management for barn-appar.
+
+    Each profile is a directory of JSON shards, one per top-level data key,
+    so a save only rewrites the shards that changed. index.json holds name,
+    last use, size and summary stats for every profile and is read once,
+    which keeps listing and switching constant-time with hundreds of
+    profiles. Shards are loaded lazily for the current profile only.
+    """
 
     def __init__(self, app_name):
         self._app_name = app_name
         self._dir = _pos2.path.join(_pos2.path.expanduser('~'), '.config', app_name, 'profiles')
         _pos2.makedirs(self._dir, exist_ok=True)
+        self._lock = _pthreading.Lock()
+        self._index = self._load_index()
+        self._names = None
         self._current = self._load_current()
+        self._shards = {}
+        self._texts = {}
+        self._touch(self._current)
+
+    # -- index --
+
+    def _index_path(self):
+        return _pos2.path.join(self._dir, 'index.json')
+
+    def _load_index(self):
+        try:
+            with open(self._index_path()) as f:
+                data = _pjson.load(f)
+            if data.get('version') == INDEX_VERSION:
+                return data['profiles']
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            pass
+        return self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Scan the directory once, picking up legacy <name>.json files."""
+        index = {}
+        for entry in _pos2.scandir(self._dir):
+            if entry.name.startswith('.') or entry.name == 'index.json':
+                continue
+            if entry.is_dir():
+                size = sum(f.stat().st_size for f in _pos2.scandir(entry.path) if f.is_file())
+                index[entry.name] = {'last_used': 0, 'size': size, 'summary': {}}
+            elif entry.name.endswith('.json'):
+                index[entry.name[:-5]] = {'last_used': 0, 'size': entry.stat().st_size,
+                                          'summary': {}}
+        return index
+
+    def _save_index(self):
+        get_writer().submit(('profile-index', self._dir), self._write_index)
+
+    def _write_index(self):
+        with self._lock:
+            snapshot = {name: dict(meta) for name, meta in self._index.items()}
+        write_json_atomic(self._index_path(), {'version': INDEX_VERSION, 'profiles': snapshot},
+                          indent=None)
+
+    def _touch(self, name):
+        with self._lock:
+            meta = self._index.get(name)
+            if meta is None:
+                meta = self._index[name] = {'last_used': 0, 'size': 0, 'summary': {}}
+                self._names = None
+            meta['last_used'] = int(_ptime.time())
+        self._save_index()
+
+    # -- profiles --
 
     def _load_current(self):
         try:
             with open(_pos2.path.join(self._dir, '.current')) as f:
-                return f.read().strip()
+                return f.read().strip() or 'default'
         except (FileNotFoundError, OSError):
             return 'default'
 
@@ -23,25 +100,130 @@ class ProfileManager:
     def current(self):
         return self._current
 
+    @property
+    def directory(self):
+        return self._dir
+
     def switch(self, name):
+        """Make name the current profile without loading any of its data."""
         self._current = name
-        with open(_pos2.path.join(self._dir, '.current'), 'w') as f:
-            f.write(name)
+        self._shards = {}
+        self._texts = {}
+        self._touch(name)
+        get_writer().submit(('profile-current', self._dir), write_atomic,
+                            _pos2.path.join(self._dir, '.current'), name)
 
     def list_profiles(self):
-        profiles = ['default']
-        for f in sorted(_pos2.listdir(self._dir)):
-            if f.endswith('.json') and f != '.current':
-                profiles.append(f[:-5])
-        return list(set(profiles))
+        if self._names is None:
+            with self._lock:
+                self._names = sorted(set(self._index) | {'default'})
+        return list(self._names)
+
+    def info(self, name=None):
+        """Return the index entry (last_used, size, summary) for a profile."""
+        with self._lock:
+            return dict(self._index.get(name or self._current, {}))
+
+    def set_summary(self, summary, name=None):
+        """Store small summary stats for a profile in the index."""
+        with self._lock:
+            meta = self._index.setdefault(name or self._current,
+                                          {'last_used': 0, 'size': 0, 'summary': {}})
+            meta['summary'] = dict(summary)
+        self._save_index()
+
+    def delete(self, name):
+        with self._lock:
+            self._index.pop(name, None)
+            self._names = None
+        if name == self._current:
+            self._shards = {}
+            self._texts = {}
+        path = self._profile_dir(name)
+        get_writer().submit(('profile-delete', name), _pshutil.rmtree, path, True)
+        self._save_index()
+
+    # -- shards --
+
+    def _profile_dir(self, name):
+        return _pos2.path.join(self._dir, name)
+
+    def _shard_path(self, name, key):
+        return _pos2.path.join(self._profile_dir(name), f'{key}.json')
+
+    def _migrate_legacy(self, name):
+        """Split a legacy <name>.json into shards on first access."""
+        legacy = _pos2.path.join(self._dir, f'{name}.json')
+        if _pos2.path.isdir(self._profile_dir(name)) or not _pos2.path.exists(legacy):
+            return
+        try:
+            with open(legacy) as f:
+                data = _pjson.load(f)
+        except (OSError, _pjson.JSONDecodeError):
+            return
+        _pos2.makedirs(self._profile_dir(name), exist_ok=True)
+        for key, value in data.items():
+            write_json_atomic(self._shard_path(name, key), value)
+        _pos2.replace(legacy, legacy + '.migrated')
+
+    def _shard_keys(self):
+        self._migrate_legacy(self._current)
+        try:
+            names = _pos2.listdir(self._profile_dir(self._current))
+        except FileNotFoundError:
+            return []
+        return [n[:-5] for n in names if n.endswith('.json') and not n.startswith('.')]
+
+    def load_shard(self, key, default=None):
+        """Return one data key of the current profile, reading it once."""
+        if key not in self._shards:
+            self._migrate_legacy(self._current)
+            try:
+                with open(self._shard_path(self._current, key)) as f:
+                    text = f.read()
+                self._shards[key] = _pjson.loads(text)
+                self._texts[key] = text
+            except (FileNotFoundError, _pjson.JSONDecodeError):
+                return default
+        return self._shards[key]
+
+    def save_shard(self, key, value):
+        """Queue one data key of the current profile for writing.
+
+        Nothing is written when the value serializes to what is on disk.
+        """
+        name = self._current
+        text = _pjson.dumps(value, ensure_ascii=False, indent=2)
+        self._shards[key] = value
+        if key not in self._texts:
+            self.load_shard(key)
+            self._shards[key] = value
+        if self._texts.get(key) == text:
+            return
+        self._texts[key] = text
+        get_writer().submit(('profile', name, key), self._write_shard, name, key, text)
+
+    def _write_shard(self, name, key, text):
+        path = self._shard_path(name, key)
+        try:
+            old = _pos2.path.getsize(path)
+        except OSError:
+            old = 0
+        write_atomic(path, text)
+        with self._lock:
+            meta = self._index.setdefault(name, {'last_used': 0, 'size': 0, 'summary': {}})
+            meta['size'] = max(0, meta['size'] + _pos2.path.getsize(path) - old)
+        self._save_index()
 
     def save_data(self, data):
-        with open(_pos2.path.join(self._dir, f'{self._current}.json'), 'w') as f:
-            _pjson.dump(data, f, ensure_ascii=False, indent=2)
+        """Save the current profile, rewriting only shards that changed."""
+        for key, value in data.items():
+            self.save_shard(key, value)
+        for key in set(self._shard_keys()) - set(data):
+            self._shards.pop(key, None)
+            self._texts.pop(key, None)
+            get_writer().submit(('profile', self._current, key), _remove_file,
+                                self._shard_path(self._current, key))
 
     def load_data(self):
-        try:
-            with open(_pos2.path.join(self._dir, f'{self._current}.json')) as f:
-                return _pjson.load(f)
-        except (FileNotFoundError, _pjson.JSONDecodeError):
-            return {}
+        return {key: self.load_shard(key) for key in self._shard_keys()}
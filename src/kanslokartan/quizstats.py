@@ -0,0 +1,119 @@
+"""Quiz answer analytics: confusion matrix, accuracy and latency.
+
+The summary is updated in O(1) per answer and saved as a small JSON file
+per profile, so it keeps the long-term picture after the raw results list
+has been capped. Answers of the last few weeks are also counted per day,
+which is what the class overview's trends are built from.
+"""
+
+import json
+import threading
+from datetime import date, timedelta
+
+from kanslokartan.writer import write_atomic
+
+VERSION = 2
+KEEP_DAYS = 28
+
+
+class QuizStats:
+    """Confusion counts and answer times per emotion id."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.matrix = {}
+        self.latency = {}
+        # "YYYY-MM-DD" -> emotion id -> [answered, correct]
+        self.days = {}
+
+    @classmethod
+    def load(cls, path, results=(), ids=None):
+        """Load the summary, rebuilding it from results if it is missing.
+
+        ids maps emotion names to ids for results recorded before ids were
+        stored with each answer.
+        """
+        stats = cls(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != VERSION:
+                raise ValueError("old summary version")
+            stats.matrix = data["matrix"]
+            stats.latency = data["latency"]
+            stats.days = data["days"]
+        except (OSError, ValueError, KeyError):
+            ids = ids or {}
+            for r in results:
+                shown = r.get("emotion_id", ids.get(r.get("emotion")))
+                chosen = r.get("chosen_id", ids.get(r.get("chosen")))
+                if shown is not None and chosen is not None:
+                    stats.record(shown, chosen, r.get("latency"), r.get("date", "")[:10] or None)
+        return stats
+
+    def record(self, shown, chosen, latency=None, day=None):
+        """Count one answer; latency is in seconds, day is "YYYY-MM-DD"."""
+        shown, chosen = str(shown), str(chosen)
+        with self._lock:
+            row = self.matrix.setdefault(shown, {})
+            row[chosen] = row.get(chosen, 0) + 1
+            if latency is not None:
+                total, count = self.latency.get(shown, (0.0, 0))
+                self.latency[shown] = (total + latency, count + 1)
+            if day is not None:
+                if day not in self.days:
+                    self._prune(day)
+                counts = self.days.setdefault(day, {}).setdefault(shown, [0, 0])
+                counts[0] += 1
+                counts[1] += shown == chosen
+
+    def _prune(self, newest):
+        try:
+            cutoff = (date.fromisoformat(newest) - timedelta(days=KEEP_DAYS)).isoformat()
+        except ValueError:
+            return
+        for day in [d for d in self.days if d < cutoff]:
+            del self.days[day]
+
+    def answered(self, emotion):
+        with self._lock:
+            return sum(self.matrix.get(str(emotion), {}).values())
+
+    def accuracy(self, emotion):
+        """Return the share of correct answers, or None if never asked."""
+        key = str(emotion)
+        with self._lock:
+            row = self.matrix.get(key, {})
+            total = sum(row.values())
+            return row.get(key, 0) / total if total else None
+
+    def mean_latency(self, emotion):
+        with self._lock:
+            total, count = self.latency.get(str(emotion), (0.0, 0))
+        return total / count if count else None
+
+    def confusions(self, emotion, n=3):
+        """Return up to n (chosen id, count) wrong answers, most common first."""
+        key = str(emotion)
+        with self._lock:
+            wrong = [(int(c), k) for c, k in self.matrix.get(key, {}).items() if c != key]
+        wrong.sort(key=lambda ck: -ck[1])
+        return wrong[:n]
+
+    def summary(self):
+        """Return answered/correct totals for the profile index."""
+        answered = correct = 0
+        with self._lock:
+            for shown, row in self.matrix.items():
+                answered += sum(row.values())
+                correct += row.get(shown, 0)
+        return {"answered": answered, "correct": correct}
+
+    def save(self):
+        """Write the summary atomically; safe to call from the writer thread."""
+        with self._lock:
+            text = json.dumps({"version": VERSION, "matrix": self.matrix,
+                               "latency": self.latency, "days": self.days},
+                              separators=(",", ":"))
+        write_atomic(self.path, text)
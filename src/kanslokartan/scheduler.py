@@ -0,0 +1,132 @@
+"""Adaptive quiz scheduling.
+
+Each emotion has a weight that grows when the child answers wrong and
+shrinks when they answer right. Weights live in a Fenwick tree, so picking
+the next emotion and updating a weight are both O(log n) even for decks of
+hundreds of emotion words.
+"""
+
+import random
+
+START_WEIGHT = 1.0
+MIN_WEIGHT = 0.2
+MAX_WEIGHT = 8.0
+CONFUSABLE = 2
+
+
+class FenwickTree:
+    """Prefix sums over float weights with O(log n) update and search."""
+
+    def __init__(self, weights):
+        self._n = len(weights)
+        self._weights = list(weights)
+        self._tree = [0.0] * (self._n + 1)
+        for i, w in enumerate(self._weights, 1):
+            self._tree[i] += w
+            parent = i + (i & -i)
+            if parent <= self._n:
+                self._tree[parent] += self._tree[i]
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        return self._weights[i]
+
+    def __setitem__(self, i, weight):
+        delta = weight - self._weights[i]
+        self._weights[i] = weight
+        i += 1
+        while i <= self._n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        total, i = 0.0, self._n
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, x):
+        """Return the index i where prefix(i) <= x < prefix(i + 1)."""
+        pos, step = 0, 1 << self._n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self._n and self._tree[nxt] <= x:
+                pos = nxt
+                x -= self._tree[nxt]
+            step >>= 1
+        return min(pos, self._n - 1)
+
+
+class Scheduler:
+    """Picks quiz items and confusable distractors from answer history."""
+
+    def __init__(self, items, stats=None, rng=None):
+        self.items = list(items)
+        self._index = {item["id"]: i for i, item in enumerate(self.items)}
+        self._stats = stats
+        self._rng = rng or random.Random()
+        self._last = None
+        self._confusable = {}
+        weights = []
+        for item in self.items:
+            weight = START_WEIGHT
+            if stats is not None:
+                accuracy = stats.accuracy(item["id"])
+                if accuracy is not None:
+                    weight += 3 * (1 - accuracy)
+                self._confusable[item["id"]] = [c for c, _n in stats.confusions(item["id"], CONFUSABLE)
+                                                if c in self._index]
+            weights.append(weight)
+        self._tree = FenwickTree(weights)
+
+    def _sample(self):
+        return self._tree.find(self._rng.random() * self._tree.total())
+
+    def next(self):
+        """Return the next item, never the same one twice in a row."""
+        last = self._last
+        if last is not None and len(self.items) > 1:
+            saved = self._tree[last]
+            self._tree[last] = 0.0
+            i = self._sample()
+            self._tree[last] = saved
+        else:
+            i = self._sample()
+        self._last = i
+        return self.items[i]
+
+    def distractors(self, item, k=3):
+        """Return k other items, led by ones this item was mistaken for."""
+        k = min(k, len(self.items) - 1)
+        chosen = [self._index[item["id"]]]
+        for c in self._confusable.get(item["id"], [])[:k - 1]:
+            chosen.append(self._index[c])
+        while len(chosen) < k + 1:
+            i = self._rng.randrange(len(self.items))
+            if i not in chosen:
+                chosen.append(i)
+        return [self.items[i] for i in chosen[1:]]
+
+    def record(self, shown, chosen):
+        """Adjust the shown item's weight after an answer."""
+        i = self._index.get(shown["id"])
+        if i is None:
+            return
+        if shown["id"] == chosen["id"]:
+            self._tree[i] = max(MIN_WEIGHT, self._tree[i] * 0.6)
+            return
+        self._tree[i] = min(MAX_WEIGHT, self._tree[i] * 2 + 0.5)
+        if self._stats is not None and chosen["id"] in self._index:
+            self._note_confusion(shown["id"], chosen["id"])
+
+    def _note_confusion(self, shown, chosen):
+        """Keep the top CONFUSABLE mix-ups for shown, in O(CONFUSABLE)."""
+        row = self._stats.matrix.get(str(shown), {})
+        top = self._confusable.setdefault(shown, [])
+        if chosen not in top:
+            top.append(chosen)
+        top.sort(key=lambda c: -row.get(str(c), 0))
+        del top[CONFUSABLE:]
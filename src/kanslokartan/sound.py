@@ -0,0 +1,65 @@
+"""In-process feedback sounds.
+
+The freedesktop cue files are opened once with Gtk.MediaFile, which decodes
+them through the GStreamer media backend, and replayed from memory instead
+of starting a player process per cue. Trigger-to-playback latency is
+measured from the first timestamp update after each play request; set
+KANSLOKARTAN_PROFILE_SOUND=1 to print it.
+"""
+
+import os
+import time
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk
+
+SOUND_DIR = "/usr/share/sounds/freedesktop/stereo"
+CUES = ("complete", "bell")
+PROFILE = bool(os.environ.get("KANSLOKARTAN_PROFILE_SOUND"))
+
+
+class SoundService:
+    """Preloaded cue players keyed by freedesktop sound name."""
+
+    def __init__(self, names=CUES, directory=SOUND_DIR):
+        self._media = {}
+        self._triggered = {}
+        self.latencies = []
+        for name in names:
+            path = os.path.join(directory, f"{name}.oga")
+            if not os.path.exists(path):
+                continue
+            media = Gtk.MediaFile.new_for_filename(path)
+            media.connect("notify::timestamp", self._on_timestamp, name)
+            self._media[name] = media
+
+    def has(self, name):
+        return name in self._media
+
+    def play(self, name):
+        """Start the cue from the beginning; returns False if not loaded."""
+        media = self._media.get(name)
+        if media is None or media.get_error() is not None:
+            return False
+        self._triggered[name] = time.monotonic()
+        if media.get_playing():
+            media.pause()
+        media.seek(0)
+        media.play()
+        return True
+
+    def _on_timestamp(self, media, _pspec, name):
+        start = self._triggered.pop(name, None)
+        if start is None or media.get_timestamp() <= 0:
+            if start is not None:
+                self._triggered[name] = start
+            return
+        latency = time.monotonic() - start
+        self.latencies.append(latency)
+        del self.latencies[:-100]
+        if PROFILE:
+            print(f"sound {name}: {latency * 1000:.1f} ms from trigger to playback")
+
+    def mean_latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
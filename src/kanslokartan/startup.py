@@ -0,0 +1,64 @@
+"""Startup timing, enabled with KANSLOKARTAN_PROFILE_STARTUP=1.
+
+Phases are marked as the GUI starts; when the first window is mapped a
+breakdown from process start is printed to stderr.
+
+Shared verbatim with the other app's tree; CI compares the copies.
+"""
+
+import os
+import sys
+import time
+
+ENABLED = bool(os.environ.get("KANSLOKARTAN_PROFILE_STARTUP"))
+
+_marks = []
+_reported = False
+
+
+def _process_start():
+    """Return the process start on the time.time() clock, if known."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return time.time() - (uptime - started)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def mark(phase):
+    """Record that phase has just finished."""
+    if ENABLED:
+        _marks.append((phase, time.time()))
+
+
+def report():
+    """Print the per-phase breakdown once."""
+    global _reported
+    if not ENABLED or _reported or not _marks:
+        return
+    _reported = True
+    start = _process_start()
+    previous = start if start is not None else _marks[0][1]
+    print("kanslokartan startup:", file=sys.stderr)
+    for phase, t in _marks:
+        print(f"  {phase:<20} {(t - previous) * 1000:8.1f} ms", file=sys.stderr)
+        previous = t
+    total = _marks[-1][1] - (start if start is not None else _marks[0][1])
+    print(f"  {'total':<20} {total * 1000:8.1f} ms", file=sys.stderr)
+
+
+def watch_window(window):
+    """Report as soon as window is first mapped."""
+    if not ENABLED:
+        return
+
+    def on_map(*_args):
+        mark("first present")
+        report()
+        window.disconnect(handler)
+
+    handler = window.connect("map", on_map)
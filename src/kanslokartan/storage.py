@@ -0,0 +1,613 @@
+"""Data access for the emotion journal and quiz results.
+
+Two engines share one interface: ``JsonStore`` (the default, plain files in
+the config directory) and ``SqliteStore`` (opt-in with
+``KANSLOKARTAN_STORAGE=sqlite``), which keeps full history and answers
+date/emotion range queries from indexes.
+
+``JsonStore`` keeps only the newest records in its hot files; older ones
+are rolled into immutable xz-compressed monthly segments under
+``archive/`` and streamed back by the query methods. ``merge_*`` inserts
+records from any period (imports) in date order; what is older than the
+hot window goes straight to the archive.
+
+Both apps read the same config directory, so this module is kept
+byte-for-byte identical in kanslokartan/ and src/kanslokartan/; the Check
+workflow fails when the copies differ.
+"""
+
+import hashlib
+import heapq
+import json
+import lzma
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from kanslokartan.writer import write_atomic, write_json_atomic
+
+MAX_ENTRIES = 500
+COMPACT_AT = MAX_ENTRIES * 2
+
+
+def _dumps(entry):
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _date(record):
+    """Return the sortable date of a record; compact ones carry epoch "t"."""
+    if "t" in record:
+        return time.strftime("%Y-%m-%d %H:%M", time.localtime(record["t"]))
+    return str(record.get("date", ""))
+
+
+def _emotion(record):
+    return str(record.get("e", record.get("emotion", "")))
+
+
+def _in_range(record, start, end, emotion):
+    date = _date(record)
+    if start is not None and date < start:
+        return False
+    if end is not None and date >= end:
+        return False
+    return emotion is None or _emotion(record) == str(emotion)
+
+
+def _month(record):
+    return _date(record)[:7] or "unknown"
+
+
+def _by_date(records):
+    """Return records as (date, JSON line) pairs in date order."""
+    return sorted(((_date(r), _dumps(r).encode("utf-8")) for r in records),
+                  key=lambda pair: pair[0])
+
+
+class Archive:
+    """Immutable compressed monthly segments plus a manifest.
+
+    Each roll writes new segment files and then the manifest, so a segment
+    is never modified once listed. Segments are sorted internally; since an
+    import can roll old months after newer ones, iter() merges segments
+    whose date ranges overlap. The manifest also remembers a hash of
+    the last rolled batch; if a crash leaves those lines in the hot file,
+    the next roll recognises and skips them instead of archiving them twice.
+    """
+
+    def __init__(self, directory):
+        self._dir = Path(directory)
+        self._manifest_path = self._dir / "manifest.json"
+        self._lock = threading.Lock()
+
+    def manifest(self):
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"version": 1, "segments": [], "last_batch": None}
+
+    def roll(self, lines):
+        """Archive raw JSON lines (bytes, newline-terminated), oldest first."""
+        with self._lock:
+            manifest = self.manifest()
+            last = manifest.get("last_batch")
+            if last and len(lines) >= last["lines"] and hashlib.sha1(
+                    b"".join(lines[:last["lines"]])).hexdigest() == last["sha1"]:
+                lines = lines[last["lines"]:]
+            if not lines:
+                return
+            months = {}
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                months.setdefault(_month(record), []).append((_date(record), line))
+            for rows in months.values():
+                rows.sort(key=lambda row: row[0])
+            self._dir.mkdir(parents=True, exist_ok=True)
+            taken = {segment["file"] for segment in manifest["segments"]}
+            for month, rows in months.items():
+                seq = 1
+                while f"{month}-{seq:03d}.jsonl.xz" in taken:
+                    seq += 1
+                name = f"{month}-{seq:03d}.jsonl.xz"
+                self._write_segment(name, [line for _date, line in rows])
+                dates = [date for date, _line in rows]
+                manifest["segments"].append({"file": name, "month": month, "count": len(rows),
+                                             "first": min(dates), "last": max(dates)})
+            manifest["last_batch"] = {"lines": len(lines),
+                                      "sha1": hashlib.sha1(b"".join(lines)).hexdigest()}
+            write_json_atomic(self._manifest_path, manifest)
+
+    def _write_segment(self, name, lines):
+        tmp = self._dir / (name + ".tmp")
+        with open(tmp, "wb") as raw:
+            with lzma.LZMAFile(raw, "wb", preset=6) as f:
+                f.writelines(lines)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, self._dir / name)
+
+    def iter(self, start=None, end=None, emotion=None):
+        """Stream archived records in range, oldest first.
+
+        Segments are read one at a time, except that segments with
+        overlapping date ranges are read together and merged.
+        """
+        segments = sorted((segment for segment in self.manifest()["segments"]
+                           if (start is None or segment["last"] >= start)
+                           and (end is None or segment["first"] < end)),
+                          key=lambda segment: (segment["first"], segment["last"]))
+        group = []
+        for segment in segments:
+            if group and segment["first"] > last:
+                yield from self._merge(group, start, end, emotion)
+                group = []
+            last = max(last, segment["last"]) if group else segment["last"]
+            group.append(segment)
+        if group:
+            yield from self._merge(group, start, end, emotion)
+
+    def _merge(self, group, start, end, emotion):
+        streams = [self._read(segment, start, end, emotion) for segment in group]
+        if len(streams) == 1:
+            return streams[0]
+        return heapq.merge(*streams, key=_date)
+
+    def _read(self, segment, start, end, emotion):
+        try:
+            with lzma.open(self._dir / segment["file"], "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if _in_range(record, start, end, emotion):
+                        yield record
+        except (OSError, lzma.LZMAError) as e:
+            print(f"Archive segment {segment['file']} unreadable: {e}")
+
+    def clear(self):
+        with self._lock:
+            for segment in self.manifest()["segments"]:
+                try:
+                    (self._dir / segment["file"]).unlink()
+                except FileNotFoundError:
+                    pass
+            try:
+                self._manifest_path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class JournalLog:
+    """Append-only JSON Lines journal, compacted in the background."""
+
+    def __init__(self, directory, archive=None):
+        self._dir = Path(directory)
+        self.path = self._dir / "journal.jsonl"
+        self._archive = archive
+        self._lock = threading.Lock()
+        self._lines = 0
+        self._generation = 0
+        self._compacting = False
+        self._thread = None
+        self._migrate()
+        self._repair()
+
+    def _migrate(self):
+        """Convert a legacy journal.json into the log, once."""
+        legacy = self._dir / "journal.json"
+        if self.path.exists() or not legacy.exists():
+            return
+        try:
+            entries = json.loads(legacy.read_text())
+        except Exception:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(_dumps(entry))
+        os.replace(tmp, self.path)
+        legacy.rename(legacy.with_name(legacy.name + ".bak"))
+
+    def _repair(self):
+        """Drop a torn last line left by a crash mid-append.
+
+        Runs once at startup, under the lock, so it can never cut an
+        append that is still being written.
+        """
+        with self._lock:
+            try:
+                with open(self.path, "r+b") as f:
+                    data = f.read()
+                    if data and not data.endswith(b"\n"):
+                        f.truncate(data.rfind(b"\n") + 1)
+            except FileNotFoundError:
+                pass
+
+    def load(self, limit=MAX_ENTRIES):
+        """Return the newest limit entries (every line for None) as dicts."""
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return []
+        # An append still in progress on the writer thread may show up as
+        # a partial last line; leave it out rather than parse or cut it.
+        data = data[:data.rfind(b"\n") + 1]
+        entries = []
+        lines = data.splitlines()
+        for line in lines if limit is None else lines[-limit:]:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        with self._lock:
+            self._lines = len(lines)
+        return entries
+
+    def append(self, entry):
+        """Append one entry; O(1) regardless of journal size."""
+        self.extend([entry])
+
+    def extend(self, entries):
+        """Append several entries with a single write."""
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(_dumps(entry) for entry in entries))
+            self._lines += len(entries)
+            compact = self._lines >= COMPACT_AT and not self._compacting
+            if compact:
+                self._compacting = True
+        if compact:
+            self._thread = threading.Thread(target=self._compact, daemon=True)
+            self._thread.start()
+
+    def merge(self, entries):
+        """Insert entries from any period into the log in date order.
+
+        Once merged, everything but the newest MAX_ENTRIES lines goes
+        straight to the archive instead of through the hot file.
+        """
+        self.wait()
+        incoming = _by_date(entries)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            try:
+                lines = self.path.read_bytes().splitlines(keepends=True)
+            except FileNotFoundError:
+                lines = []
+            current = []
+            for line in lines:
+                try:
+                    current.append((_date(json.loads(line)), line))
+                except ValueError:
+                    continue
+            current.sort(key=lambda pair: pair[0])
+            merged = [line for _when, line in heapq.merge(current, incoming,
+                                                           key=lambda pair: pair[0])]
+            if len(merged) >= COMPACT_AT and self._archive is not None:
+                self._archive.roll(merged[:-MAX_ENTRIES])
+                merged = merged[-MAX_ENTRIES:]
+            with open(tmp, "wb") as out:
+                out.writelines(merged)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, self.path)
+            self._lines = len(merged)
+            self._generation += 1
+
+    def wait(self, timeout=None):
+        """Wait for a running background compaction to finish."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def clear(self):
+        with self._lock:
+            open(self.path, "w").close()
+            self._lines = 0
+            self._generation += 1
+
+    def rewrite(self, convert):
+        """Replace every record with convert(record), atomically."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            try:
+                lines = self.path.read_bytes().splitlines()
+            except FileNotFoundError:
+                return
+            with open(tmp, "w", encoding="utf-8") as out:
+                for line in lines:
+                    try:
+                        out.write(_dumps(convert(json.loads(line))))
+                    except ValueError:
+                        continue
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, self.path)
+            self._lines = len(lines)
+            self._generation += 1
+
+    def _compact(self):
+        """Rewrite the log keeping only the newest MAX_ENTRIES lines.
+
+        Older lines go to the archive first. Appends made while compacting
+        land after the snapshot offset and are copied over under the lock
+        just before the rename.
+        """
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with self._lock:
+                end = self.path.stat().st_size
+                generation = self._generation
+            with open(self.path, "rb") as f:
+                lines = f.read(end).splitlines(keepends=True)
+            keep = lines[-MAX_ENTRIES:]
+            if self._archive is not None:
+                self._archive.roll(lines[:-MAX_ENTRIES])
+            with open(tmp, "wb") as out:
+                out.writelines(keep)
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    with open(self.path, "rb") as f:
+                        f.seek(end)
+                        tail = f.read()
+                    out.write(tail)
+                    out.flush()
+                    os.fsync(out.fileno())
+                    os.replace(tmp, self.path)
+                    self._lines = len(keep) + tail.count(b"\n")
+        except OSError:
+            pass
+        finally:
+            self._compacting = False
+            if tmp.exists():
+                tmp.unlink()
+
+
+class JsonStore:
+    """Journal log plus results.json holding the newest MAX_ENTRIES records.
+
+    Older records live in the archive; load_* only reads the hot files while
+    query_* streams the archive first, so exports see the full history.
+    """
+
+    def __init__(self, directory):
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._journal_archive = Archive(self._dir / "archive" / "journal")
+        self._results_archive = Archive(self._dir / "archive" / "results")
+        self._journal = JournalLog(self._dir, self._journal_archive)
+        self._results_path = self._dir / "results.json"
+        self._results = None
+
+    def load_journal(self, limit=MAX_ENTRIES):
+        """Return the newest limit entries (all kept ones for None)."""
+        return self._journal.load(limit)
+
+    def append_journal(self, entry):
+        self._journal.append(entry)
+
+    def extend_journal(self, entries):
+        self._journal.extend(entries)
+
+    def merge_journal(self, entries):
+        """Add entries from any period, keeping the history in date order."""
+        self._journal.merge(entries)
+
+    def clear_journal(self):
+        self._journal.clear()
+        self._journal_archive.clear()
+
+    def journal_version(self):
+        try:
+            return int((self._dir / "journal.version").read_text())
+        except (OSError, ValueError):
+            return 1
+
+    def migrate_journal(self, convert, version):
+        """Rewrite the hot journal through convert and record version.
+
+        Archived segments stay immutable; readers must accept both formats.
+        """
+        self._journal.rewrite(convert)
+        write_atomic(self._dir / "journal.version", str(version))
+
+    def query_journal(self, start=None, end=None, emotion=None):
+        """Yield journal entries with start <= date < end, oldest first."""
+        yield from self._journal_archive.iter(start, end, emotion)
+        for entry in self._journal.load(None):
+            if _in_range(entry, start, end, emotion):
+                yield entry
+
+    def load_results(self, limit=MAX_ENTRIES):
+        if self._results is None:
+            try:
+                with open(self._results_path, encoding="utf-8") as f:
+                    self._results = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._results = []
+        return list(self._results) if limit is None else self._results[-limit:]
+
+    def append_result(self, result):
+        self.extend_results([result])
+
+    def extend_results(self, results):
+        self._results = self.load_results(None) + list(results)
+        if len(self._results) >= COMPACT_AT:
+            self._results_archive.roll([_dumps(r).encode("utf-8")
+                                        for r in self._results[:-MAX_ENTRIES]])
+            self._results = self._results[-MAX_ENTRIES:]
+        write_json_atomic(self._results_path, self._results)
+
+    def merge_results(self, results):
+        """Add results from any period, keeping the history in date order."""
+        merged = sorted(self.load_results(None) + list(results), key=_date)
+        if len(merged) >= COMPACT_AT:
+            self._results_archive.roll([_dumps(r).encode("utf-8")
+                                        for r in merged[:-MAX_ENTRIES]])
+            merged = merged[-MAX_ENTRIES:]
+        self._results = merged
+        write_json_atomic(self._results_path, self._results)
+
+    def query_results(self, start=None, end=None, emotion=None):
+        yield from self._results_archive.iter(start, end, emotion)
+        for result in self.load_results(None):
+            if _in_range(result, start, end, emotion):
+                yield result
+
+    def close(self):
+        self._journal.wait()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS journal_date ON journal(date);
+CREATE INDEX IF NOT EXISTS journal_emotion ON journal(emotion, date);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_date ON results(date);
+CREATE INDEX IF NOT EXISTS results_emotion ON results(emotion, date);
+"""
+
+
+class SqliteStore:
+    """SQLite (WAL) store keeping full history with date/emotion indexes."""
+
+    def __init__(self, directory):
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._path = str(self._dir / "kanslokartan.db")
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.executescript(_SCHEMA)
+        self._import_json()
+
+    def _import_json(self):
+        """Seed empty tables from the JSON files on first use."""
+        legacy = JsonStore(self._dir)
+        for table, rows in (("journal", legacy.query_journal()),
+                            ("results", legacy.query_results())):
+            if not self._count(table):
+                self._insert(table, rows)
+
+    def _count(self, table):
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def _insert(self, table, records):
+        rows = [(_date(r), _emotion(r), json.dumps(r, ensure_ascii=False)) for r in records]
+        with self._lock, self._db:
+            self._db.executemany(
+                f"INSERT INTO {table} (date, emotion, data) VALUES (?, ?, ?)", rows)
+
+    def _latest(self, table, limit):
+        # By date rather than id: merged imports can add older rows last.
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT data FROM {table} ORDER BY date DESC, id DESC LIMIT ?",
+                (-1 if limit is None else limit,)).fetchall()
+        return [json.loads(data) for data, in reversed(rows)]
+
+    def _query(self, table, start, end, emotion):
+        sql = f"SELECT data FROM {table} WHERE 1"
+        args = []
+        if start is not None:
+            sql += " AND date >= ?"
+            args.append(start)
+        if end is not None:
+            sql += " AND date < ?"
+            args.append(end)
+        if emotion is not None:
+            sql += " AND emotion = ?"
+            args.append(str(emotion))
+        # A private connection streams rows without holding the writer's
+        # lock; WAL lets it read while new records are appended.
+        db = sqlite3.connect(self._path)
+        try:
+            for data, in db.execute(sql + " ORDER BY date, id", args):
+                yield json.loads(data)
+        finally:
+            db.close()
+
+    def load_journal(self, limit=MAX_ENTRIES):
+        """Return the newest limit entries (the full history for None)."""
+        return self._latest("journal", limit)
+
+    def append_journal(self, entry):
+        self._insert("journal", [entry])
+
+    def extend_journal(self, entries):
+        self._insert("journal", entries)
+
+    def merge_journal(self, entries):
+        self._insert("journal", entries)
+
+    def clear_journal(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM journal")
+
+    def journal_version(self):
+        with self._lock:
+            return self._db.execute("PRAGMA user_version").fetchone()[0] or 1
+
+    def migrate_journal(self, convert, version):
+        """Rewrite every journal row through convert and record version."""
+        with self._lock, self._db:
+            rows = self._db.execute("SELECT id, data FROM journal").fetchall()
+            updates = []
+            for row_id, data in rows:
+                record = convert(json.loads(data))
+                updates.append((_date(record), _emotion(record),
+                                json.dumps(record, ensure_ascii=False), row_id))
+            self._db.executemany(
+                "UPDATE journal SET date = ?, emotion = ?, data = ? WHERE id = ?", updates)
+            self._db.execute(f"PRAGMA user_version = {int(version)}")
+
+    def query_journal(self, start=None, end=None, emotion=None):
+        """Yield journal entries with start <= date < end, oldest first."""
+        return self._query("journal", start, end, emotion)
+
+    def load_results(self, limit=MAX_ENTRIES):
+        return self._latest("results", limit)
+
+    def append_result(self, result):
+        self._insert("results", [result])
+
+    def extend_results(self, results):
+        self._insert("results", results)
+
+    def merge_results(self, results):
+        self._insert("results", results)
+
+    def query_results(self, start=None, end=None, emotion=None):
+        return self._query("results", start, end, emotion)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_store(directory):
+    """Return the storage engine selected by KANSLOKARTAN_STORAGE."""
+    if os.environ.get("KANSLOKARTAN_STORAGE", "").lower() == "sqlite":
+        return SqliteStore(directory)
+    return JsonStore(directory)